@@ -0,0 +1,224 @@
+"""
+Headless batch runner for the study planner
+-------------------------------------------
+Generates study plans for many students outside of Streamlit. Exams and weekly
+study times are read from CSV or JSON, the plans are generated in parallel with
+generate_study_plans_batch, and every plan is written as CSV (or Parquet) and
+ICS, together with a summary of the Fach-Statistiken and the fairness and
+diversity metrics.
+
+Input formats:
+    CSV   --exams exams.csv --plan plan.csv
+          exams.csv has the columns of the exam page (Fachname, Prüfungsdatum,
+          Schwierigkeit, Start, Kategorie) plus a student column (default
+          'Student'). plan.csv has Tag and Lernzeit (h); with a student column
+          each student gets their own week, without one the week is shared.
+    JSON  --input students.json
+          A list of objects {"student": ..., "exams": [...], "plan": [...],
+          "settings": {...}} with records in the same columns as the CSV files.
+          "settings" is optional and overrides --settings for that student.
+
+Output (in --output-dir):
+    <student>/lernplan.csv (or .parquet), <student>/lernplan.ics
+    fach_statistiken.csv    one row per student and subject
+    zusammenfassung.csv     one row per student with fairness/diversity metrics
+                            and the error message of failed students
+
+With --store the plans are also saved in a plan store database (plan_store.py),
+keyed by student and plan_fingerprint, e.g. the one the Streamlit app reads.
+
+Usage:
+    python batch_runner.py --exams exams.csv --plan plan.csv --output-dir plans
+    python batch_runner.py --input students.json --output-dir plans --workers 8 --format parquet
+    python batch_runner.py --input students.json --store lernplaene.db
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+import warnings
+
+import pandas as pd
+
+from my_func import generate_study_plans_batch, plan_fingerprint, write_ics_file
+from plan_store import PlanStore
+
+_PLAN_FORMATS = ['csv', 'parquet']
+
+
+def _student_key(value):
+    """Student ids from CSV can be read as numbers; use one string form everywhere."""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+def load_students_csv(exams_path, plan_path, student_column='Student'):
+    """Read exams and weekly plans from CSV as a list of (student, df_exam, df_plan, settings)."""
+    df_exams = pd.read_csv(exams_path)
+    df_plans = pd.read_csv(plan_path)
+    if student_column not in df_exams.columns:
+        raise ValueError(f"{exams_path} has no student column '{student_column}'")
+
+    shared_plan = None if student_column in df_plans.columns else df_plans
+    plans = {} if shared_plan is not None else {
+        _student_key(student): df.drop(columns=student_column).reset_index(drop=True)
+        for student, df in df_plans.groupby(student_column, sort=False)
+    }
+
+    students = []
+    for student, df_exam in df_exams.groupby(student_column, sort=False):
+        key = _student_key(student)
+        df_plan = shared_plan if shared_plan is not None else plans.get(key)
+        if df_plan is None:
+            raise ValueError(f"No weekly plan for student '{key}' in {plan_path}")
+        students.append((key, df_exam.drop(columns=student_column).reset_index(drop=True),
+                         df_plan.copy(), None))
+    return students
+
+
+def load_students_json(path):
+    """Read students from a JSON list as (student, df_exam, df_plan, settings)."""
+    with open(path, encoding='utf-8') as f:
+        entries = json.load(f)
+
+    students = []
+    for pos, entry in enumerate(entries):
+        key = _student_key(entry.get('student', pos + 1))
+        students.append((key, pd.DataFrame(entry['exams']), pd.DataFrame(entry['plan']),
+                         entry.get('settings')))
+    return students
+
+
+def _dateiname(student):
+    """Turn a student id into a safe directory name."""
+    return re.sub(r'[^\w.-]+', '_', student).strip('._') or 'student'
+
+
+def write_plan(df_lernplan, directory, plan_format='csv'):
+    """Write one plan as lernplan.csv/.parquet and lernplan.ics into directory."""
+    os.makedirs(directory, exist_ok=True)
+    df_export = df_lernplan.copy()
+    df_export.attrs = {}
+    if plan_format == 'parquet':
+        df_export.to_parquet(os.path.join(directory, 'lernplan.parquet'), index=False)
+    else:
+        df_export.to_csv(os.path.join(directory, 'lernplan.csv'), index=False)
+
+    with open(os.path.join(directory, 'lernplan.ics'), 'w', encoding='utf-8', newline='') as f:
+        write_ics_file(df_lernplan, f, newline='\r\n')
+
+
+def summarize(student, gesamt_stats, fehler):
+    """Build the summary row of one student and the per-subject rows of its Fach-Statistiken."""
+    zeile = {'Student': student, 'Fehler': fehler}
+    fach_zeilen = []
+    if gesamt_stats is None:
+        return zeile, fach_zeilen
+
+    zeile['Gesamte verfügbare Lernzeit (h)'] = gesamt_stats['Gesamte verfügbare Lernzeit (h)']
+    zeile['Gesamtzahl der Tage im Lernplan'] = gesamt_stats['Gesamtzahl der Tage im Lernplan']
+    zeile['Anzahl der Prüfungsfächer'] = gesamt_stats['Anzahl der Prüfungsfächer']
+    for name, wert in gesamt_stats['Fairness-Metriken'].items():
+        zeile[f'fairness_{name}'] = float(wert)
+    for name, wert in gesamt_stats['Diversitäts-Metriken'].items():
+        zeile[f'diversity_{name}'] = float(wert)
+
+    for fach, stats in gesamt_stats['Fach-Statistiken'].items():
+        fach_zeilen.append({'Student': student, 'Fach': fach, **stats})
+    return zeile, fach_zeilen
+
+
+def run_batch(students, output_dir, workers=None, settings=None, plan_format='csv', store=None):
+    """
+    Generate and write the plans of all students.
+
+    Returns the summary and the Fach-Statistiken as two DataFrames; both are also
+    written to output_dir. With a PlanStore the plans are saved there as well, in
+    one bulk insert.
+    """
+    inputs, fingerprints = [], []
+    for _, df_exam, df_plan, student_settings in students:
+        merged = dict(settings or {})
+        merged.update(student_settings or {})
+        inputs.append((df_exam, df_plan, merged))
+        # Keyed by the inputs as given, the same key the app computes before generating
+        fingerprints.append(plan_fingerprint(df_exam, df_plan, merged))
+
+    results = generate_study_plans_batch(inputs, workers=workers)
+
+    os.makedirs(output_dir, exist_ok=True)
+    zeilen, fach_zeilen, gespeichert = [], [], []
+    verwendet = set()
+    for (student, _, _, _), fingerprint, (df_lernplan, gesamt_stats, fehler) in zip(
+            students, fingerprints, results):
+        if df_lernplan is not None:
+            gespeichert.append((student, fingerprint, df_lernplan, gesamt_stats))
+            # Distinct student ids can map to the same directory name
+            name = _dateiname(student)
+            while name in verwendet:
+                name += '_'
+            verwendet.add(name)
+            write_plan(df_lernplan, os.path.join(output_dir, name), plan_format)
+        zeile, faecher = summarize(student, gesamt_stats, fehler)
+        zeilen.append(zeile)
+        fach_zeilen.extend(faecher)
+
+    df_summary = pd.DataFrame(zeilen)
+    df_faecher = pd.DataFrame(fach_zeilen, columns=['Student', 'Fach', 'target_hours', 'scheduled_hours',
+                                                    'percentage', 'shortfall'])
+    df_summary.to_csv(os.path.join(output_dir, 'zusammenfassung.csv'), index=False)
+    df_faecher.to_csv(os.path.join(output_dir, 'fach_statistiken.csv'), index=False)
+    if store is not None:
+        store.save_many(gespeichert)
+    return df_summary, df_faecher
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    quelle = parser.add_mutually_exclusive_group(required=True)
+    quelle.add_argument('--input', help='JSON file with one entry per student')
+    quelle.add_argument('--exams', help='CSV file with the exams of all students')
+    parser.add_argument('--plan', help='CSV file with the weekly study times (required with --exams)')
+    parser.add_argument('--student-column', default='Student', help='student id column in the CSV files')
+    parser.add_argument('--settings', help='JSON file with settings for generate_complete_study_plan')
+    parser.add_argument('--output-dir', default='lernplaene', help='where to write plans and summaries')
+    parser.add_argument('--format', choices=_PLAN_FORMATS, default='csv',
+                        help='file format of the plans (parquet needs pyarrow)')
+    parser.add_argument('--workers', type=int, help='number of worker processes (default: CPU cores)')
+    parser.add_argument('--store', help='also save the plans in this plan store database (SQLite)')
+    args = parser.parse_args(argv)
+
+    if args.exams and not args.plan:
+        parser.error('--plan is required with --exams')
+
+    settings = None
+    if args.settings:
+        with open(args.settings, encoding='utf-8') as f:
+            settings = json.load(f)
+
+    if args.input:
+        students = load_students_json(args.input)
+    else:
+        students = load_students_csv(args.exams, args.plan, args.student_column)
+
+    warnings.simplefilter('ignore', FutureWarning)
+    start = time.perf_counter()
+    store = PlanStore(args.store) if args.store else None
+    df_summary, _ = run_batch(students, args.output_dir, workers=args.workers, settings=settings,
+                              plan_format=args.format, store=store)
+    elapsed = time.perf_counter() - start
+
+    fehler = df_summary[df_summary['Fehler'].notna()]
+    print(f"{len(students) - len(fehler)} von {len(students)} Lernplänen in {elapsed:.1f} s "
+          f"nach {args.output_dir} geschrieben.")
+    for _, zeile in fehler.iterrows():
+        print(f"  {zeile['Student']}: {zeile['Fehler']}")
+    return 1 if len(fehler) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
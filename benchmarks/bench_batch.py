@@ -0,0 +1,51 @@
+"""
+Benchmark for generate_study_plans_batch
+----------------------------------------
+Generates the same cohort of synthetic students with 1, 2, 4, ... workers and
+prints plans per second and the speedup over a single process.
+
+Usage: python benchmarks/bench_batch.py [--students 64] [--max-workers 8]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from my_func import generate_study_plans_batch
+from synthetic import create_synthetic_input
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, default=64)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    inputs = [create_synthetic_input(n_exams=6, horizon_days=180, review_share=0.5, weekly_hours=21.0, seed=seed)
+              for seed in range(args.students)]
+
+    worker_counts = [1]
+    while worker_counts[-1] * 2 <= args.max_workers:
+        worker_counts.append(worker_counts[-1] * 2)
+    if worker_counts[-1] != args.max_workers:
+        worker_counts.append(args.max_workers)
+
+    print(f"{args.students} Lernpläne, {os.cpu_count()} CPU-Kerne")
+    print(f"{'Worker':>6} {'Zeit (s)':>9} {'Pläne/s':>8} {'Speedup':>8}")
+    baseline = None
+    for workers in worker_counts:
+        start = time.perf_counter()
+        results = generate_study_plans_batch(inputs, workers=workers)
+        elapsed = time.perf_counter() - start
+        failures = sum(1 for _, _, fehler in results if fehler is not None)
+        if baseline is None:
+            baseline = elapsed
+        note = f"  ({failures} Fehler)" if failures else ""
+        print(f"{workers:>6} {elapsed:>9.2f} {args.students / elapsed:>8.1f} {baseline / elapsed:>7.2f}x{note}")
+
+
+if __name__ == "__main__":
+    main()
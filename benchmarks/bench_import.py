@@ -0,0 +1,85 @@
+"""
+Import-time benchmark for the Lernplan page
+-------------------------------------------
+Measures how long importing the page's dependencies takes in a fresh Python
+process, i.e. what the first page load on a new Streamlit server pays before
+any plan is generated. Every module is imported in its own interpreter, so
+nothing is shared between measurements. Modules that are not installed are
+reported and skipped.
+
+With --top the slowest modules (cumulative, from python -X importtime) behind
+each measured import are listed as well.
+
+Usage:
+    python benchmarks/bench_import.py
+    python benchmarks/bench_import.py --modules my_func,palette --repeat 10 --top 5
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Imports of pages/03_03 Lernplan.py, plus matplotlib.pyplot for comparison with
+# the palette lookup it used to be imported for
+DEFAULT_MODULES = ['pandas', 'my_func', 'palette', 'streamlit', 'streamlit_calendar', 'matplotlib.pyplot']
+
+_TIMER = (
+    "import time, importlib; start = time.perf_counter(); "
+    "importlib.import_module({module!r}); print(time.perf_counter() - start)"
+)
+
+
+def _run(args):
+    return subprocess.run([sys.executable] + args, cwd=ROOT, capture_output=True, text=True)
+
+
+def time_import(module, repeat=5):
+    """Median seconds to import module in a fresh interpreter, or None if it is not installed."""
+    timings = []
+    for _ in range(repeat):
+        result = _run(['-c', _TIMER.format(module=module)])
+        if result.returncode != 0:
+            return None
+        timings.append(float(result.stdout.strip().splitlines()[-1]))
+    return statistics.median(timings)
+
+
+def slowest_imports(module, top=5):
+    """(cumulative µs, module) of the slowest imports behind module, from -X importtime."""
+    result = _run(['-X', 'importtime', '-c', f'import {module}'])
+    eintraege = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, kumuliert, name = line[len('import time:'):].split('|')
+        if name.strip() != module:
+            eintraege.append((int(kumuliert), name.strip()))
+    return sorted(eintraege, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modules', help='comma separated modules, default: the imports of the Lernplan page')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=0, help='list the N slowest imports behind each module')
+    args = parser.parse_args()
+
+    modules = [m.strip() for m in args.modules.split(',') if m.strip()] if args.modules else DEFAULT_MODULES
+
+    print(f"{'Modul':<22} {'Import (ms)':>12}")
+    for module in modules:
+        dauer = time_import(module, args.repeat)
+        if dauer is None:
+            print(f"{module:<22} {'nicht installiert':>12}")
+            continue
+        print(f"{module:<22} {dauer * 1000:>12.1f}")
+        for kumuliert, name in slowest_imports(module, args.top) if args.top else []:
+            print(f"    {name:<30} {kumuliert / 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Memory benchmark for generate_complete_study_plan
+-------------------------------------------------
+Measures the peak of Python-tracked allocations (tracemalloc) while one plan is
+generated, once with the in-place pipeline (default) and once with
+copy_stages=True, where every stage works on its own copy of the plan. The
+calendar cache is cleared before each run, so both modes build their calendar
+skeleton themselves.
+
+Usage: python benchmarks/bench_memory.py [--exams 10] [--horizons 180,730,1095]
+"""
+
+import argparse
+import os
+import sys
+import tracemalloc
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from my_func import clear_calendar_cache, generate_complete_study_plan
+from synthetic import create_synthetic_input
+
+
+def peak_memory(df_exam, df_plan, copy_stages):
+    """Peak traced memory in bytes of one plan generation, and the size of the finished plan."""
+    df_exam, df_plan = df_exam.copy(), df_plan.copy()
+    # A cached skeleton would only be copied by whichever mode runs second
+    clear_calendar_cache()
+    tracemalloc.start()
+    try:
+        df_lernplan, _ = generate_complete_study_plan(df_exam, df_plan, copy_stages=copy_stages)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak, int(df_lernplan.memory_usage(deep=True).sum())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--exams', type=int, default=10)
+    parser.add_argument('--horizons', default='180,730,1095', help='comma separated horizons in days')
+    parser.add_argument('--review-share', type=float, default=0.3)
+    args = parser.parse_args()
+
+    warnings.simplefilter('ignore', FutureWarning)
+    horizons = [int(h) for h in args.horizons.split(',') if h.strip()]
+
+    # Warm-up of both modes at a real input size: some one-off allocations (imports, lazily
+    # built lookup tables) only happen on larger plans and would be charged to the first mode
+    warmup = create_synthetic_input(args.exams, min(horizons), args.review_share)
+    for copy_stages in (True, False):
+        peak_memory(*warmup, copy_stages=copy_stages)
+
+    print(f"{'Tage':>6} {'Plan (KB)':>10} {'Kopien (KB)':>12} {'In-place (KB)':>14} {'Ersparnis':>10}")
+    for horizon in horizons:
+        df_exam, df_plan = create_synthetic_input(args.exams, horizon, args.review_share)
+        kopien, groesse = peak_memory(df_exam, df_plan, copy_stages=True)
+        inplace, _ = peak_memory(df_exam, df_plan, copy_stages=False)
+        print(f"{horizon:>6} {groesse / 1024:>10.0f} {kopien / 1024:>12.0f} {inplace / 1024:>14.0f} "
+              f"{1 - inplace / kopien:>9.0%}")
+
+
+if __name__ == "__main__":
+    main()
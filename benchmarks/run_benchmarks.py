@@ -0,0 +1,153 @@
+"""
+Benchmark suite for generate_complete_study_plan
+------------------------------------------------
+Times the planning pipeline over a grid of synthetic inputs (number of exams,
+horizon, share of Anki/Sprache subjects, weekly hours) and writes the results
+as JSON. With --baseline the results are compared against a stored run and
+every configuration that got slower than the threshold is reported as a
+regression (exit code 1).
+
+Usage:
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --quick --baseline benchmarks/baseline.json --threshold 0.25
+    python benchmarks/run_benchmarks.py --save-baseline benchmarks/baseline.json
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from my_func import generate_complete_study_plan
+from synthetic import create_synthetic_input
+
+FULL_GRID = {
+    'exams': [1, 5, 10, 25, 50, 100],
+    'horizons': [14, 90, 365, 1095],
+    'review_shares': [0.0, 0.5],
+    'weekly_hours': [10.0, 35.0],
+}
+QUICK_GRID = {
+    'exams': [1, 10, 50],
+    'horizons': [14, 180, 730],
+    'review_shares': [0.3],
+    'weekly_hours': [21.0],
+}
+
+
+def _parse_list(text, typ):
+    return [typ(item) for item in text.split(',') if item.strip()]
+
+
+def config_name(n_exams, horizon_days, review_share, weekly_hours):
+    return f"exams={n_exams}/days={horizon_days}/reviews={review_share:g}/hours={weekly_hours:g}"
+
+
+def time_configuration(n_exams, horizon_days, review_share, weekly_hours, repeat=3, seed=0):
+    """Time generate_complete_study_plan for one configuration."""
+    timings = []
+    for _ in range(repeat):
+        df_exam, df_plan = create_synthetic_input(n_exams, horizon_days, review_share, weekly_hours, seed)
+        start = time.perf_counter()
+        df_lernplan, _ = generate_complete_study_plan(df_exam, df_plan)
+        timings.append(time.perf_counter() - start)
+    return {
+        'name': config_name(n_exams, horizon_days, review_share, weekly_hours),
+        'params': {
+            'exams': n_exams,
+            'horizon_days': horizon_days,
+            'review_share': review_share,
+            'weekly_hours': weekly_hours,
+        },
+        'plan_days': len(df_lernplan),
+        'repeat': repeat,
+        'min_s': min(timings),
+        'median_s': statistics.median(timings),
+    }
+
+
+def compare_with_baseline(results, baseline, threshold):
+    """Return (name, baseline_s, current_s, ratio) for every configuration slower than the threshold."""
+    baseline_by_name = {entry['name']: entry for entry in baseline.get('results', [])}
+    regressions = []
+    for entry in results:
+        reference = baseline_by_name.get(entry['name'])
+        if reference is None or reference['median_s'] <= 0:
+            continue
+        ratio = entry['median_s'] / reference['median_s']
+        if ratio > 1 + threshold:
+            regressions.append((entry['name'], reference['median_s'], entry['median_s'], ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--quick', action='store_true', help='use the small default grid')
+    parser.add_argument('--exams', help='comma separated exam counts, e.g. 1,10,100')
+    parser.add_argument('--horizons', help='comma separated horizons in days, e.g. 14,365,1095')
+    parser.add_argument('--review-shares', help='comma separated shares of Anki/Sprache subjects, e.g. 0,0.5')
+    parser.add_argument('--weekly-hours', help='comma separated weekly study hours, e.g. 10,35')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default='benchmark_results.json', help='where to write the results')
+    parser.add_argument('--baseline', help='results file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='allowed slowdown relative to the baseline (0.2 = 20%%)')
+    parser.add_argument('--save-baseline', help='also write the results to this baseline file')
+    args = parser.parse_args()
+
+    grid = dict(QUICK_GRID if args.quick else FULL_GRID)
+    if args.exams:
+        grid['exams'] = _parse_list(args.exams, int)
+    if args.horizons:
+        grid['horizons'] = _parse_list(args.horizons, int)
+    if args.review_shares:
+        grid['review_shares'] = _parse_list(args.review_shares, float)
+    if args.weekly_hours:
+        grid['weekly_hours'] = _parse_list(args.weekly_hours, float)
+
+    warnings.simplefilter('ignore', FutureWarning)
+    results = []
+    for combo in itertools.product(grid['exams'], grid['horizons'], grid['review_shares'], grid['weekly_hours']):
+        entry = time_configuration(*combo, repeat=args.repeat)
+        results.append(entry)
+        print(f"{entry['name']:<45} {entry['median_s'] * 1000:>10.1f} ms")
+
+    report = {
+        'meta': {
+            'created': pd.Timestamp.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count(),
+        },
+        'results': results,
+    }
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} Regression(en) über {args.threshold:.0%}:")
+            for name, alt, neu, ratio in regressions:
+                print(f"  {name}: {alt * 1000:.1f} ms -> {neu * 1000:.1f} ms ({ratio:.2f}x)")
+            sys.exit(1)
+        print(f"\nKeine Regressionen über {args.threshold:.0%} gegenüber {args.baseline}.")
+
+
+if __name__ == "__main__":
+    main()
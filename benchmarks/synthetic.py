@@ -0,0 +1,55 @@
+"""
+Synthetic inputs for the planning pipeline
+------------------------------------------
+Builds (df_exam, df_plan) pairs in the same shape the input pages store in
+st.session_state, with a configurable number of exams, horizon, share of
+Anki/Sprache subjects and weekly study hours.
+"""
+
+import numpy as np
+import pandas as pd
+
+WOCHENTAGE = ['Montag', 'Dienstag', 'Mittwoch', 'Donnerstag', 'Freitag', 'Samstag', 'Sonntag']
+SCHWIERIGKEITEN = ['🟢 Leicht', '🟡 Mittel', '🟠 Anspruchsvoll', '🔴 Schwer']
+STARTS = ['Jetzt', '1 Woche vorher', '2 Wochen vorher', '1 Monat vorher']
+REVIEW_KATEGORIEN = ['Anki', 'Sprache']
+ANDERE_KATEGORIEN = ['Rechenfach', 'Auswendiglernen', 'Sonstiges']
+
+
+def create_weekly_plan(weekly_hours):
+    """Spread a weekly total of study hours evenly over the week, in quarter hours."""
+    pro_tag = round(weekly_hours / 7 * 4) / 4
+    return pd.DataFrame({'Tag': WOCHENTAGE, 'Lernzeit (h)': [float(pro_tag)] * 7})
+
+
+def create_synthetic_input(n_exams=5, horizon_days=180, review_share=0.3, weekly_hours=21.0, seed=0):
+    """
+    Create one synthetic (df_exam, df_plan) input.
+    
+    The plan runs from today (the first exam starts 'Jetzt') until the last exam,
+    which is placed exactly horizon_days ahead. With more exams than days, several
+    exams share a date.
+    """
+    rng = np.random.default_rng(seed)
+    today = pd.Timestamp.today().normalize()
+    
+    tage = np.arange(1, horizon_days + 1)
+    offsets = np.sort(rng.choice(tage, n_exams, replace=n_exams > len(tage)))
+    offsets[-1] = horizon_days
+    
+    n_reviews = int(round(n_exams * review_share))
+    kategorien = ([REVIEW_KATEGORIEN[i % 2] for i in range(n_reviews)]
+                  + list(rng.choice(ANDERE_KATEGORIEN, n_exams - n_reviews)))
+    kategorien = list(rng.permutation(kategorien))
+    
+    starts = list(rng.choice(STARTS, n_exams))
+    starts[0] = 'Jetzt'
+    
+    df_exam = pd.DataFrame({
+        'Fachname': [f'Fach {i + 1}' for i in range(n_exams)],
+        'Kategorie': kategorien,
+        'Prüfungsdatum': [(today + pd.Timedelta(days=int(o))).date() for o in offsets],
+        'Schwierigkeit': list(rng.choice(SCHWIERIGKEITEN, n_exams)),
+        'Start': starts,
+    })
+    return df_exam, create_weekly_plan(weekly_hours)
@@ -8,7 +8,20 @@ A tool to create optimized study plans based on exam schedules, subject difficul
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from collections import defaultdict
+import copy
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict, deque, namedtuple
+from itertools import islice
+
+# Nanoseconds per day, used for date arithmetic on int64 date arrays
+_NS_PER_DAY = 86_400_000_000_000
 
 # -------------------------------------------------------------------------------
 # SECTION 1: DATA PREPARATION
@@ -73,64 +86,124 @@ def cleanup_exam_data(df_exam):
     return df_copy
 
 
-def berechne_gesamt_lernzeit(df_exam, df_plan):
-    """Calculate total available study time based on exam and plan data."""
-    # Define time period
-    start_datum = df_exam["Lernstart"].min()
-    end_datum = df_exam["Prüfungsdatum"].max()
+CalendarCacheInfo = namedtuple("CalendarCacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+# Calendar skeletons by (start, end, study hours Monday..Sunday)
+_calendar_cache = OrderedDict()
+_calendar_cache_lock = threading.Lock()
+_calendar_cache_stats = {'hits': 0, 'misses': 0}
+_calendar_cache_maxsize = 64
+
+
+def _wochenstunden(df_plan):
+    """Study hours per weekday (Monday..Sunday) from a prepared weekly plan, NaN where a day is missing."""
+    stunden = [np.nan] * 7
+    for wochentag, lernzeit in zip(df_plan["Weekday (int)"], df_plan["Lernzeit (h)"]):
+        if pd.notna(wochentag) and np.isnan(stunden[int(wochentag)]):
+            stunden[int(wochentag)] = float(lernzeit)
+    return tuple(stunden)
+
+
+def _kalender_skelett(start_datum, end_datum, wochenstunden):
+    """Build the calendar frame (Datum, Wochentag, Lernzeit (h)) for a period and weekly pattern."""
     datum_range = pd.date_range(start=start_datum, end=end_datum)
-    gesamttage = len(datum_range)
+    wochentag = datum_range.weekday
+    return pd.DataFrame({
+        "Datum": datum_range,
+        "Wochentag": wochentag,
+        "Lernzeit (h)": np.asarray(wochenstunden)[wochentag],
+    })
 
-    # Build calendar
-    df_kalender = pd.DataFrame({"Datum": datum_range})
-    df_kalender["Wochentag"] = df_kalender["Datum"].dt.weekday
 
-    # Assign study time per weekday
-    df_kalender = df_kalender.merge(
-        df_plan[["Weekday (int)", "Lernzeit (h)"]],
-        left_on="Wochentag", right_on="Weekday (int)", how="left"
-    )
-    df_kalender = df_kalender.drop('Weekday (int)', axis=1)
+def _summe_lernzeit(start_datum, gesamttage, wochenstunden):
+    """Total hours of all study days in the period: full weeks plus the remaining days."""
+    positiv = [stunden if stunden > 0 else 0.0 for stunden in wochenstunden]
+    volle_wochen, rest = divmod(gesamttage, 7)
+    erster_wochentag = pd.Timestamp(start_datum).weekday()
+    return volle_wochen * sum(positiv) + sum(positiv[(erster_wochentag + i) % 7] for i in range(rest))
+
+
+def berechne_gesamt_lernzeit(df_exam, df_plan):
+    """
+    Calculate total available study time based on exam and plan data.
+    
+    The calendar skeleton is cached per (start date, end date, weekly hours); callers
+    get their own copy of it.
+    """
+    # Define time period
+    start_datum = pd.Timestamp(df_exam["Lernstart"].min())
+    end_datum = pd.Timestamp(df_exam["Prüfungsdatum"].max())
+    wochenstunden = _wochenstunden(df_plan)
+    key = (start_datum.value, end_datum.value, wochenstunden)
+    
+    with _calendar_cache_lock:
+        df_kalender = _calendar_cache.get(key)
+        if df_kalender is not None:
+            _calendar_cache.move_to_end(key)
+            _calendar_cache_stats['hits'] += 1
+        else:
+            _calendar_cache_stats['misses'] += 1
+    
+    if df_kalender is None:
+        df_kalender = _kalender_skelett(start_datum, end_datum, wochenstunden)
+        with _calendar_cache_lock:
+            _calendar_cache[key] = df_kalender
+            while len(_calendar_cache) > _calendar_cache_maxsize:
+                _calendar_cache.popitem(last=False)
     
-    # Only consider days with study time
-    valid_calendar = df_kalender[df_kalender["Lernzeit (h)"] > 0].copy()
+    # Only days with study time count towards the total
+    gesamttage = len(df_kalender)
+    gesamtstunden = _summe_lernzeit(start_datum, gesamttage, wochenstunden)
+    
+    return gesamtstunden, gesamttage, df_kalender.copy()
 
-    # Calculate total study time
-    gesamtstunden = valid_calendar["Lernzeit (h)"].sum()
 
-    return gesamtstunden, gesamttage, df_kalender
+def calendar_cache_info():
+    """Return hits, misses, maxsize and current size of the calendar skeleton cache."""
+    with _calendar_cache_lock:
+        return CalendarCacheInfo(_calendar_cache_stats['hits'], _calendar_cache_stats['misses'],
+                                 _calendar_cache_maxsize, len(_calendar_cache))
 
 
-def erweitere_kalender_mit_pruefungstagen(df_kalender, df_exam):
-    """Add exam dates to the calendar."""
-    df_kalender = df_kalender.copy()
-    df_kalender["Prüfung"] = None  # Empty column for exam subjects
+def clear_calendar_cache(maxsize=None):
+    """Remove all cached calendar skeletons, reset the counters and optionally change the cache size."""
+    global _calendar_cache_maxsize
+    with _calendar_cache_lock:
+        _calendar_cache.clear()
+        _calendar_cache_stats['hits'] = 0
+        _calendar_cache_stats['misses'] = 0
+        if maxsize is not None:
+            _calendar_cache_maxsize = max(0, maxsize)
+
+
+def erweitere_kalender_mit_pruefungstagen(df_kalender, df_exam, inplace=False):
+    """Add exam dates to the calendar (to the given frame itself with inplace=True)."""
+    if not inplace:
+        df_kalender = df_kalender.copy()
     
     # Convert date to datetime if not already done
     df_kalender["Datum"] = pd.to_datetime(df_kalender["Datum"])
     
-    for _, row in df_exam.iterrows():
-        fach = row["Fachname"]
-        pruefungsdatum = pd.to_datetime(row["Prüfungsdatum"])
-        
-        # Check if an exam subject is already entered for this day
-        existing_entry = df_kalender.loc[df_kalender["Datum"] == pruefungsdatum, "Prüfung"].values
-        
-        if len(existing_entry) > 0 and pd.notna(existing_entry[0]):
-            # If a subject is already entered, add the new subject separated by comma
-            df_kalender.loc[df_kalender["Datum"] == pruefungsdatum, "Prüfung"] = existing_entry[0] + ", " + fach
-        else:
-            # Otherwise, enter the subject directly
-            df_kalender.loc[df_kalender["Datum"] == pruefungsdatum, "Prüfung"] = fach
+    # Join the subjects of each exam date once, comma separated in exam order
+    pruefungen = pd.DataFrame({
+        "Datum": pd.to_datetime(df_exam["Prüfungsdatum"]).to_numpy(),
+        "Fachname": df_exam["Fachname"].to_numpy(),
+    })
+    pruefungen_pro_tag = pruefungen.groupby("Datum", sort=False)["Fachname"].agg(", ".join)
+    
+    # Look up every calendar day in one pass; days without exams stay empty (None)
+    pruefung = df_kalender["Datum"].map(pruefungen_pro_tag).astype(object)
+    df_kalender["Prüfung"] = pruefung.where(pruefung.notna(), None)
     
     return df_kalender
 
 
-def berechne_zielstunden(df_exam, df_kalender):
-    """Calculate target hours for each subject based on difficulty."""
+def berechne_zielstunden(df_exam, df_kalender, inplace=False):
+    """Calculate target hours for each subject based on difficulty (in df_exam itself with inplace=True)."""
     # Weight mapping based on difficulty
     gewicht_map = {3: 1.0, 2: 0.9, 1: 0.8, 0: 0.7}
-    df_exam = df_exam.copy()
+    if not inplace:
+        df_exam = df_exam.copy()
     
     # Add weighting
     df_exam['Gewichtung'] = df_exam['Schwierigkeit_Nr'].map(gewicht_map)
@@ -150,32 +223,34 @@ def berechne_zielstunden(df_exam, df_kalender):
     return df_exam
 
 
-def erstelle_fächer(df_kalender):
-    """Create study subjects columns in the calendar."""
-    df_lernplan = df_kalender.copy()
+def erstelle_fächer(df_kalender, inplace=False):
+    """Create study subjects columns in the calendar (in the given frame itself with inplace=True)."""
+    df_lernplan = df_kalender if inplace else df_kalender.copy()
     for i in range(1, 4):
         df_lernplan[f'Lernfach {i}'] = None
         df_lernplan[f'Dauer {i}'] = 0.0  # Use float instead of int for consistency
     return df_lernplan
 
 
-def aktualisiere_freie_zeit(df):
-    """Update the free time on the calendar, handling exam days correctly."""
-    df = df.copy()
+def aktualisiere_freie_zeit(df, inplace=False):
+    """
+    Update the free time on the calendar, handling exam days correctly.
     
-    # First set study time to 0 on exam days 
-    for i, row in df.iterrows():
-        if pd.notna(row['Prüfung']):
-            df.at[i, 'Lernzeit (h)'] = 0.0
-            # Also reset any study subjects and durations on exam days
-            for j in range(1, 4):
-                df.at[i, f'Lernfach {j}'] = None
-                df.at[i, f'Dauer {j}'] = 0.0
+    With inplace=True the given frame is updated and returned instead of a copy.
+    """
+    if not inplace:
+        df = df.copy()
+    
+    # First set study time to 0 on exam days and reset any study subjects and durations there
+    pruefungstag = df['Prüfung'].notna().to_numpy()
+    if pruefungstag.any():
+        df.loc[pruefungstag, 'Lernzeit (h)'] = 0.0
+        for j in range(1, 4):
+            df.loc[pruefungstag, f'Lernfach {j}'] = None
+            df.loc[pruefungstag, f'Dauer {j}'] = 0.0
     
-    # Then calculate free time based on available study time minus planned time
-    df["freie_zeit"] = df["Lernzeit (h)"] - df[["Dauer 1", "Dauer 2", "Dauer 3"]].sum(axis=1)
-    # Ensure free time is never negative
-    df["freie_zeit"] = df["freie_zeit"].clip(lower=0)
+    # Then calculate free time based on available study time minus planned time (never negative)
+    df["freie_zeit"] = (df["Lernzeit (h)"] - df[["Dauer 1", "Dauer 2", "Dauer 3"]].sum(axis=1)).clip(lower=0)
     
     return df
 
@@ -184,8 +259,18 @@ def aktualisiere_freie_zeit(df):
 # SECTION 2: SCHEDULING DAILY REVIEWS
 # -------------------------------------------------------------------------------
 
-def plane_daily_reviews(df_pre, df_exam, wiederhol_dauer=0.5):
-    """Plan daily review sessions for Anki and language subjects."""
+def _letzter_review_termin(df_exam):
+    """Return the last day reviews are planned for: the second-to-last exam date."""
+    if len(df_exam) > 1:
+        letzter_termin = df_exam.sort_values("Prüfungsdatum")["Prüfungsdatum"].iloc[-2]
+    else:
+        letzter_termin = df_exam["Prüfungsdatum"].max()  # If only one exam
+    
+    return pd.to_datetime(letzter_termin)
+
+
+def plane_daily_reviews(df_pre, df_exam, wiederhol_dauer=0.5, inplace=False):
+    """Plan daily review sessions for Anki and language subjects (in df_pre itself with inplace=True)."""
     # Initialize columns if not present
     if "Daily Review" not in df_pre.columns:
         df_pre["Daily Review"] = ""
@@ -193,62 +278,79 @@ def plane_daily_reviews(df_pre, df_exam, wiederhol_dauer=0.5):
         df_pre["Dauer 4"] = 0.0
 
     # Determine the second-to-last exam date
-    if len(df_exam) > 1:
-        letzter_termin = df_exam.sort_values("Prüfungsdatum")["Prüfungsdatum"].iloc[-2]
-    else:
-        letzter_termin = df_exam["Prüfungsdatum"].max()  # If only one exam
-    
-    letzter_termin = pd.to_datetime(letzter_termin)
+    letzter_termin = _letzter_review_termin(df_exam)
 
     # Create a copy to avoid the SettingWithCopyWarning
-    df_result = df_pre.copy()
+    df_result = df_pre if inplace else df_pre.copy()
+
+    review_exams = df_exam[df_exam["Kategorie"].isin(["Anki", "Sprache"])]
+    if review_exams.empty:
+        return df_result
+
+    # Days that can take a review at all: not after the second-to-last exam,
+    # no exam on the day itself and no exam on the following day
+    datum = pd.to_datetime(df_result["Datum"]).to_numpy()
+    exam_day = df_result["Prüfung"].notna().to_numpy()
+    exam_eve = np.isin(datum + np.timedelta64(1, "D"), datum[exam_day])
+    offene_tage = (datum <= letzter_termin.to_datetime64()) & ~exam_day & ~exam_eve
 
-    for _, fach_row in df_exam.iterrows():
-        if fach_row["Kategorie"] not in ["Anki", "Sprache"]:
+    lernzeit = df_result["Lernzeit (h)"].to_numpy()
+    dauer_4 = df_result["Dauer 4"].to_numpy()
+    freie_zeit = df_result["freie_zeit"].to_numpy() if "freie_zeit" in df_result.columns else None
+
+    # Reviews that are already entered, so a subject is not added twice on the same day
+    bisherige_reviews = df_result["Daily Review"].tolist()
+    enthalten = {}
+    if any(bisherige_reviews):
+        for fach in review_exams["Fachname"].unique():
+            enthalten[fach] = np.array(
+                [bool(review) and fach in review.split(", ") for review in bisherige_reviews]
+            )
+
+    # Subjects are planned one after another, because each review uses up study time
+    # that the next subject's "enough time" check has to see
+    geplant = []
+    for fach, start, ende in zip(review_exams["Fachname"],
+                                 pd.to_datetime(review_exams["Lernstart"]),
+                                 pd.to_datetime(review_exams["Prüfungsdatum"])):
+        maske = (
+            (datum >= start.to_datetime64()) & (datum <= ende.to_datetime64())
+            & offene_tage
+            & ~(lernzeit < wiederhol_dauer)
+        )
+        if fach in enthalten:
+            maske &= ~enthalten[fach]
+        if not maske.any():
             continue
 
-        fach = fach_row["Fachname"]
-        start = pd.to_datetime(fach_row["Lernstart"])
-        ende = pd.to_datetime(fach_row["Prüfungsdatum"])
+        enthalten[fach] = enthalten[fach] | maske if fach in enthalten else maske
+        geplant.append((fach, maske))
 
-        for idx, row in df_result.iterrows():
-            datum = pd.to_datetime(row["Datum"])
-            
-            # Skip if outside study period for this subject
-            if not (start <= datum <= ende):
-                continue
-                
-            # Skip if after the second-to-last exam
-            if datum > letzter_termin:
-                continue
-                
-            # Skip if there's an exam on this day
-            if pd.notna(row["Prüfung"]):
-                continue
+        # Update review duration, available study time and free time (never negative)
+        dauer_4 = np.where(maske, dauer_4 + wiederhol_dauer, dauer_4)
+        lernzeit = np.where(maske, lernzeit - wiederhol_dauer, lernzeit)
+        if freie_zeit is not None:
+            rest = freie_zeit - wiederhol_dauer
+            freie_zeit = np.where(maske, np.where(rest > 0, rest, 0), freie_zeit)
 
-            # Skip if the next day has an exam
-            next_day = datum + pd.Timedelta(days=1)
-            next_day_rows = df_result[df_result["Datum"] == next_day]
-            if not next_day_rows.empty and pd.notna(next_day_rows.iloc[0]["Prüfung"]):
-                continue
+    if not geplant:
+        return df_result
 
-            # Skip if there's not enough available time
-            if row["Lernzeit (h)"] < wiederhol_dauer:
-                continue
+    # Build the review strings in a single pass over the days that received a review
+    faecher = [fach for fach, _ in geplant]
+    belegung = np.vstack([maske for _, maske in geplant])
+    reviews = list(bisherige_reviews)
+    for idx in np.flatnonzero(belegung.any(axis=0)):
+        teile = [faecher[k] for k in np.flatnonzero(belegung[:, idx])]
+        if reviews[idx]:
+            teile.insert(0, reviews[idx])
+        reviews[idx] = ", ".join(teile).strip(", ")
 
-            # Add the subject to daily reviews if not already included
-            aktuelle_review = df_result.at[idx, "Daily Review"]
-            if not aktuelle_review or fach not in aktuelle_review.split(", "):
-                neue_review = f"{aktuelle_review}, {fach}" if aktuelle_review else fach
-                df_result.at[idx, "Daily Review"] = neue_review.strip(", ")
-                df_result.at[idx, "Dauer 4"] += wiederhol_dauer
-                
-                # Update available study time and free time
-                df_result.at[idx, "Lernzeit (h)"] -= wiederhol_dauer
-                if "freie_zeit" in df_result.columns:
-                    df_result.at[idx, "freie_zeit"] -= wiederhol_dauer
-                    # Ensure free time doesn't go negative
-                    df_result.at[idx, "freie_zeit"] = max(0, df_result.at[idx, "freie_zeit"])
+    df_result["Daily Review"] = reviews
+    df_result["Dauer 4"] = dauer_4
+    df_result["Lernzeit (h)"] = lernzeit
+    if freie_zeit is not None:
+        df_result["freie_zeit"] = freie_zeit
 
     return df_result
 
@@ -257,9 +359,9 @@ def plane_daily_reviews(df_pre, df_exam, wiederhol_dauer=0.5):
 # SECTION 3: PLANNING STUDY SESSIONS
 # -------------------------------------------------------------------------------
 
-def fülle_vortage_aller_prüfungen(df_all):
-    """Fill the days before exams with study time for the exam subjects."""
-    df = df_all.copy()
+def fülle_vortage_aller_prüfungen(df_all, inplace=False):
+    """Fill the days before exams with study time for the exam subjects (in df_all itself with inplace=True)."""
+    df = df_all if inplace else df_all.copy()
     df["Datum"] = pd.to_datetime(df["Datum"])
     
     # Extract exams
@@ -337,73 +439,152 @@ def fülle_vortage_aller_prüfungen(df_all):
                     df.at[idx, "Dauer 1"] = min(gesamt, 4.0)  # Allocate up to 4 hours
     
     # Update free time after filling the study plan
-    for idx in df.index:
-        total_scheduled = sum(df.loc[idx, f"Dauer {i}"] for i in range(1, 4) if pd.notna(df.loc[idx, f"Dauer {i}"]))
-        df.loc[idx, "freie_zeit"] = max(0, df.loc[idx, "Lernzeit (h)"] - total_scheduled)
-    
-    return df
+    return aktualisiere_freie_zeit(df, inplace=True)
 
 
 def get_total_study_time_by_subject(df):
     """Calculate total study time per subject from the study plan."""
-    fach_spalten = ['Lernfach 1', 'Lernfach 2', 'Lernfach 3']
-    dauer_spalten = ['Dauer 1', 'Dauer 2', 'Dauer 3']
-
-    frames = []
-
-    # Process regular subjects
-    for fach_col, dauer_col in zip(fach_spalten, dauer_spalten):
-        temp = df[[fach_col, dauer_col]].copy()
-        temp.columns = ['Lernfach', 'Lernzeit (h)']
-        temp = temp[temp['Lernfach'].notnull() & (temp['Lernzeit (h)'] > 0)]
-        frames.append(temp)
-
-    # Process Daily Review entries
-    if "Daily Review" in df.columns and "Dauer 4" in df.columns:
-        for idx, row in df.iterrows():
-            eintrag = row["Daily Review"]
-            dauer_gesamt = row["Dauer 4"]
-            
-            # Skip if no entry or duration is zero/NaN
-            if pd.isna(eintrag) or not eintrag.strip() or pd.isna(dauer_gesamt) or dauer_gesamt <= 0:
-                continue
-                
-            fächer = [fach.strip() for fach in eintrag.split(",") if fach.strip()]
-            if not fächer:
-                continue
-                
-            # Calculate duration per subject, avoid division by zero
-            dauer_pro_fach = dauer_gesamt / len(fächer) if len(fächer) > 0 else 0
-            
-            for fach in fächer:
-                frames.append(pd.DataFrame({
-                    "Lernfach": [fach],
-                    "Lernzeit (h)": [dauer_pro_fach]
-                }))
-
-    # Combine and group
-    if frames:
-        combined = pd.concat(frames, ignore_index=True)
-        result = combined.groupby('Lernfach')['Lernzeit (h)'].sum().reset_index()
-        result.columns = ['Lernfach', 'Geplante Lernzeit']
-    else:
-        # Return empty DataFrame with correct columns if no data
-        result = pd.DataFrame(columns=['Lernfach', 'Geplante Lernzeit'])
-        
+    # Study slots and the (already split) daily reviews, one row per session
+    sitzungen = plan_sessions(df)
+    sitzungen = sitzungen[sitzungen['Stunden'] > 0]
+    
+    result = sitzungen.groupby('Fach', observed=True)['Stunden'].sum().reset_index()
+    result.columns = ['Lernfach', 'Geplante Lernzeit']
+    result['Lernfach'] = result['Lernfach'].astype(object)
+    
     return result
 
 
+def _load_plan_grid(df):
+    """Load the day x slot grid of a (date-sorted) study plan into plain lists."""
+    return {
+        'dates': df['Datum'].to_numpy(dtype='datetime64[ns]').view('int64').tolist(),
+        'hours': df['Lernzeit (h)'].tolist(),
+        'has_exam': df['Prüfung'].notna().tolist(),
+        'subjects': [df[f'Lernfach {i}'].tolist() for i in range(1, 4)],
+        'durations': [df[f'Dauer {i}'].tolist() for i in range(1, 4)],
+        'empty': [df[f'Lernfach {i}'].isna().tolist() for i in range(1, 4)],
+    }
+
+
+def _store_plan_grid(df, grid):
+    """Write the slot columns of a grid from _load_plan_grid back into the frame."""
+    for i in range(3):
+        # Keep the object dtype with None for empty slots; a plain list would be inferred as str
+        faecher = [None if fach is None or fach != fach else fach for fach in grid['subjects'][i]]
+        df[f'Lernfach {i + 1}'] = pd.Series(faecher, index=df.index, dtype=object)
+        df[f'Dauer {i + 1}'] = grid['durations'][i]
+
+
+def _diversity_metrics(df, max_consecutive_days):
+    """Measure how well subjects are mixed in a date-sorted study plan."""
+    # Filled slots in chronological order (day by day, slot 1-3), as subject codes
+    faecher = np.column_stack([df[f'Lernfach {i}'].to_numpy(dtype=object) for i in range(1, 4)]).ravel()
+    codes, _ = pd.factorize(faecher[pd.notna(faecher)])
+    
+    if len(codes) == 0:
+        return {
+            'max_consecutive_days': 0,
+            'avg_consecutive_days': 0,
+            'long_sequences_count': 0
+        }
+    
+    # Run-length encoding: a new sequence starts wherever the subject changes
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    sequences = np.diff(np.r_[starts, len(codes)])
+    return {
+        'max_consecutive_days': int(sequences.max()),
+        'avg_consecutive_days': len(codes) / len(sequences),
+        'long_sequences_count': int(np.count_nonzero(sequences > max_consecutive_days))
+    }
+
+
+def _fairness_metrics(subjects, target_hours, scheduled_hours):
+    """Completion stats per subject and the fairness metrics over their percentages."""
+    target_hours = np.asarray(target_hours, dtype=float)
+    scheduled_hours = np.asarray(scheduled_hours, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percentages = np.where(target_hours > 0, (scheduled_hours / target_hours) * 100, 100.0)
+    shortfall = target_hours - scheduled_hours
+    
+    final_stats = {
+        subject: {
+            'target_hours': target,
+            'scheduled_hours': scheduled,
+            'percentage': percentage,
+            'shortfall': fehlend
+        }
+        for subject, target, scheduled, percentage, fehlend in zip(
+            subjects, target_hours.tolist(), scheduled_hours.tolist(), percentages.tolist(), shortfall.tolist())
+    }
+    
+    werte = percentages.tolist()
+    fairness_metrics = {
+        'min_percentage': min(werte) if werte else 0,
+        'max_percentage': max(werte) if werte else 0,
+        'avg_percentage': sum(werte) / len(werte) if werte else 0,
+        'std_deviation': np.std(percentages) if werte else 0
+    }
+    return final_stats, fairness_metrics
+
+
+def evaluate_plan(plan, targets=None, max_consecutive_days=2):
+    """
+    Evaluate a finished study plan with the same metrics fill_study_plan stores in df.attrs.
+    
+    plan : DataFrame
+        Study plan in wide format, sorted by date.
+    targets : dict, optional
+        {subject: target hours}; default: the target_hours from plan.attrs['completion_stats'].
+        Without targets, completion_stats and fairness_metrics stay empty.
+    max_consecutive_days : int
+        Runs of the same subject longer than this count as too long.
+    
+    Returns {'completion_stats': ..., 'fairness_metrics': ..., 'diversity_metrics': ...}.
+    The scheduled hours are counted from the plan itself (study slots and the shares
+    of the daily reviews).
+    """
+    if targets is None:
+        targets = {fach: stats['target_hours']
+                   for fach, stats in plan.attrs.get('completion_stats', {}).items()}
+    subjects = list(targets)
+    
+    # Scheduled hours per target subject: one bincount over the flat sessions
+    _, _, faecher, stunden = _sitzungen(plan)
+    codes = pd.Index(subjects).get_indexer(faecher) if len(faecher) else np.array([], dtype=np.int64)
+    bekannt = codes >= 0
+    scheduled = np.bincount(codes[bekannt], weights=stunden[bekannt], minlength=len(subjects))
+    
+    completion_stats, fairness_metrics = ({}, {}) if not subjects else _fairness_metrics(
+        subjects, [targets[fach] for fach in subjects], scheduled)
+    return {
+        'completion_stats': completion_stats,
+        'fairness_metrics': fairness_metrics,
+        'diversity_metrics': _diversity_metrics(plan, max_consecutive_days)
+    }
+
+
 def fill_study_plan(df_exam, df_pre, df_bereits_verplante_stunden, 
                    split_threshold=4.0, split_ratio=0.5, 
                    exam_proximity_weight=3.0, fairness_weight=2.5, 
                    min_days_between=2, max_consecutive_days=2,
-                   dedicated_days_before_exam=2):
+                   dedicated_days_before_exam=2, engine='greedy', inplace=False):
     """
     Fill the study plan based on target hours and already planned hours,
     with even distribution of subjects across days.
+    
+    engine='greedy' (default) uses the day-by-day priority heuristic below.
+    engine='optimize' computes the allocation with _optimize_allocation instead,
+    which maximizes the lowest completion percentage and then the total scheduled
+    hours; the penalty weights of the heuristic are not used there.
+    
+    With inplace=True the slots are filled in df_pre itself instead of a copy.
     """
+    if engine not in FILL_ENGINES:
+        raise ValueError(f"Unknown engine: {engine!r} (expected one of {', '.join(FILL_ENGINES)})")
+    
     # Create a copy of df_pre to avoid modifying the original
-    study_plan = df_pre.copy()
+    study_plan = df_pre if inplace else df_pre.copy()
     
     # Convert date strings to datetime objects if they're not already
     if isinstance(study_plan['Datum'].iloc[0], str):
@@ -429,11 +610,17 @@ def fill_study_plan(df_exam, df_pre, df_bereits_verplante_stunden,
     # Create a mapping of exam dates to subjects for dedicated study days
     exam_to_subject = {}
     
+    # Subjects whose exam lies before the plan (e.g. the rest of a plan in update_plan)
+    # can get no more hours, so they do not count towards the scaled targets
+    plan_start = pd.Timestamp(study_plan['Datum'].min()).value
+    
     for _, row in df_exam.iterrows():
         subject = row['Fachname']
         target_hours = row['Zielstunden']
         total_target_hours += target_hours
-        exam_date = row['Prüfungsdatum']
+        # Dates are handled as int64 nanoseconds inside the scheduling kernel
+        exam_date = pd.Timestamp(row['Prüfungsdatum']).value
+        start_date = pd.Timestamp(row['Lernstart']).value
         
         # Map exam date to subject
         if exam_date in exam_to_subject:
@@ -451,20 +638,19 @@ def fill_study_plan(df_exam, df_pre, df_bereits_verplante_stunden,
             'already_planned': already_planned,
             'remaining_hours': max(0, target_hours - already_planned),
             'exam_date': exam_date,
-            'start_date': row['Lernstart'],
+            'start_date': start_date,
             'difficulty': row.get('Schwierigkeit_Nr', 1),
             'weight': row.get('Gewichtung', 1.0),
             'last_scheduled': None,
             'scheduled_count': 0,
-            'total_study_period': (exam_date - row['Lernstart']).days,
+            'total_study_period': (exam_date - start_date) // _NS_PER_DAY,
             'percentage_complete': already_planned / target_hours if target_hours > 0 else 1.0,
-            'scheduled_dates': [],
             'consecutive_days': 0,
             'current_streak': 0
         }
         
         # Add to total remaining hours if there are hours left to plan
-        if subjects_remaining[subject]['remaining_hours'] > 0:
+        if subjects_remaining[subject]['remaining_hours'] > 0 and exam_date >= plan_start:
             total_adjusted_target += subjects_remaining[subject]['remaining_hours']
     
     # Calculate if we have enough time to fulfill all target hours
@@ -482,32 +668,66 @@ def fill_study_plan(df_exam, df_pre, df_bereits_verplante_stunden,
             subjects_remaining[subject]['adjusted_remaining'] = subjects_remaining[subject]['remaining_hours']
     
     # Sort dates to ensure chronological processing
-    study_plan = study_plan.sort_values(by='Datum')
+    if not study_plan['Datum'].is_monotonic_increasing:
+        study_plan = study_plan.sort_values(by='Datum')
+    
+    # Load the day x slot grid into plain arrays once; the greedy allocation
+    # below works on these and the frame is written back in one pass at the end
+    grid = _load_plan_grid(study_plan)
+    day_dates = grid['dates']
+    day_hours = grid['hours']
+    day_has_exam = grid['has_exam']
+    slot_subjects = grid['subjects']
+    slot_durations = grid['durations']
+    slot_empty = grid['empty']
     
     # Initialize tracking structures
     day_subjects = {}
     scheduled_hours = {subject: 0 for subject in subjects_remaining.keys()}
     last_date = None
-    daily_schedules = defaultdict(list)
+    daily_schedules = {}
+    
+    # Rolling window over the last 5 days in daily_schedules for the variety score:
+    # recent_days holds their dates, recent_counts on how many of them each subject was studied
+    recent_days = deque(maxlen=5)
+    recent_counts = defaultdict(int)
     
     # Helper function to round study hours to nearest 0.25
     def round_to_quarter(hours):
         return round(hours * 4) / 4
     
+    # Helper function to open a day in daily_schedules, pushing it into the rolling window
+    def open_day(current_date):
+        if len(recent_days) == recent_days.maxlen:
+            for subject in set(daily_schedules[recent_days[0]]):
+                recent_counts[subject] -= 1
+        recent_days.append(current_date)
+        daily_schedules[current_date] = []
+    
+    # Helper function to record a subject studied on the current (newest) day
+    def record_schedule(current_date, subject):
+        if current_date not in daily_schedules:
+            open_day(current_date)
+        if subject not in daily_schedules[current_date]:
+            recent_counts[subject] += 1
+        daily_schedules[current_date].append(subject)
+    
     # Helper function to update consecutive days tracking
     def update_consecutive_days(current_date):
         # Reset consecutive days for subjects not studied today
         for subject, info in subjects_remaining.items():
             # If subject was studied on previous day but not today
             if info['last_scheduled'] is not None and info['last_scheduled'] != current_date:
-                days_gap = (current_date - info['last_scheduled']).days
+                days_gap = (current_date - info['last_scheduled']) // _NS_PER_DAY
                 if days_gap > 1:  # If there's a gap, reset the streak
                     subjects_remaining[subject]['current_streak'] = 0
         
         # For subjects studied today, update their streaks
+        if current_date not in daily_schedules:
+            open_day(current_date)
         for subject in daily_schedules[current_date]:
             if subjects_remaining[subject]['last_scheduled'] is not None:
-                days_gap = (current_date - subjects_remaining[subject]['last_scheduled']).days
+                days_gap = (current_date - subjects_remaining[subject]['last_scheduled']) // _NS_PER_DAY
                 if days_gap == 1:  # If studied on consecutive days
                     subjects_remaining[subject]['current_streak'] += 1
                 else:
@@ -517,30 +737,34 @@ def fill_study_plan(df_exam, df_pre, df_bereits_verplante_stunden,
     
     # First, identify days that should be dedicated to specific subjects due to upcoming exams
     dedicated_study_days = {}
+    plan_dates = set(day_dates)
     
     for exam_date, subject in exam_to_subject.items():
         # For each day in the dedicated_days_before_exam range
         for days_before in range(1, dedicated_days_before_exam + 1):
-            dedicated_date = exam_date - timedelta(days=days_before)
+            dedicated_date = exam_date - days_before * _NS_PER_DAY
             # Check if this day exists in our study plan
-            matching_days = study_plan[study_plan['Datum'] == dedicated_date]
-            if not matching_days.empty:
+            if dedicated_date in plan_dates:
                 dedicated_study_days[dedicated_date] = subject
     
+    if engine == 'optimize':
+        scheduled_hours = _optimize_allocation(grid, subjects_remaining, dedicated_study_days, split_threshold)
+        return _finish_study_plan(study_plan, grid, subjects_remaining, scheduled_hours, max_consecutive_days)
+    
     # Process each day in the study plan
-    for idx, day in study_plan.iterrows():
-        current_date = day['Datum']
-        available_hours = day['Lernzeit (h)']
+    for pos in range(len(day_dates)):
+        current_date = day_dates[pos]
+        available_hours = day_hours[pos]
         
         # Skip days with no study time or already planned exams
-        if available_hours <= 0 or pd.notna(day['Prüfung']):
+        if available_hours <= 0 or day_has_exam[pos]:
             continue
         
         # Calculate already planned hours for this day
         already_planned_hours = 0
-        for i in range(1, 4):
-            if pd.notna(day[f'Lernfach {i}']) and day[f'Dauer {i}'] > 0:
-                already_planned_hours += day[f'Dauer {i}']
+        for i in range(3):
+            if not slot_empty[i][pos] and slot_durations[i][pos] > 0:
+                already_planned_hours += slot_durations[i][pos]
         
         # Skip if no hours remaining
         remaining_hours = available_hours - already_planned_hours
@@ -549,9 +773,9 @@ def fill_study_plan(df_exam, df_pre, df_bereits_verplante_stunden,
             
         # Find the next available slot (1, 2, or 3)
         next_slot = None
-        for i in range(1, 4):
-            if pd.isna(day[f'Lernfach {i}']) or day[f'Lernfach {i}'] is None or day[f'Dauer {i}'] == 0:
-                next_slot = i
+        for i in range(3):
+            if slot_empty[i][pos] or slot_durations[i][pos] == 0:
+                next_slot = i + 1
                 break
                 
         if next_slot is None:
@@ -592,18 +816,17 @@ def fill_study_plan(df_exam, df_pre, df_bereits_verplante_stunden,
                     
                     if hours > 0:
                         # Update the study plan
-                        study_plan.at[idx, f'Lernfach {next_slot}'] = ded_subject
-                        study_plan.at[idx, f'Dauer {next_slot}'] = hours
+                        slot_subjects[next_slot - 1][pos] = ded_subject
+                        slot_durations[next_slot - 1][pos] = hours
                         
                         # Update subject tracking
                         day_subjects[current_date].add(ded_subject)
-                        daily_schedules[current_date].append(ded_subject)
+                        record_schedule(current_date, ded_subject)
                         
                         # Update remaining hours and tracking info
                         subjects_remaining[ded_subject]['adjusted_remaining'] -= hours
                         subjects_remaining[ded_subject]['last_scheduled'] = current_date
                         subjects_remaining[ded_subject]['scheduled_count'] += 1
-                        subjects_remaining[ded_subject]['scheduled_dates'].append(current_date)
                         scheduled_hours[ded_subject] += hours
                         
                         # Update remaining hours for this day
@@ -632,7 +855,7 @@ def fill_study_plan(df_exam, df_pre, df_bereits_verplante_stunden,
 
         # Sort subjects by priority, with stronger emphasis on exam proximity
         def get_priority_score(subject_info, subject_name):
-            days_until_exam = max(1, (subject_info['exam_date'] - current_date).days)
+            days_until_exam = max(1, (subject_info['exam_date'] - current_date) // _NS_PER_DAY)
             total_period = max(1, subject_info['total_study_period'])
             
             # Calculate progress in the study period (0 to 1 scale)
@@ -657,9 +880,9 @@ def fill_study_plan(df_exam, df_pre, df_bereits_verplante_stunden,
             
             # Calculate recency penalty (spaced repetition)
             recency_penalty = 0
-            if subject_info['scheduled_dates']:
+            if subject_info['last_scheduled'] is not None:
                 # Get days since this subject was last scheduled
-                days_since_last = (current_date - max(subject_info['scheduled_dates'])).days
+                days_since_last = (current_date - subject_info['last_scheduled']) // _NS_PER_DAY
                 
                 # Strong penalty for subjects studied too recently (to enforce spaced repetition)
                 if days_since_last < min_days_between:
@@ -680,11 +903,7 @@ def fill_study_plan(df_exam, df_pre, df_bereits_verplante_stunden,
             variety_score = 0
             if len(daily_schedules) > 5:  # If we have at least 5 days of schedule
                 # Look at the last 5 scheduled days
-                recent_days = sorted(daily_schedules.keys())[-5:]
-                subject_count = 0
-                for day in recent_days:
-                    if subject_name in daily_schedules[day]:
-                        subject_count += 1
+                subject_count = recent_counts[subject_name]
                 
                 # If this subject has been scheduled a lot recently, penalize it
                 if subject_count > 0:
@@ -692,29 +911,46 @@ def fill_study_plan(df_exam, df_pre, df_bereits_verplante_stunden,
             
             return urgency - frequency_penalty - recency_penalty - consecutive_penalty + fairness_boost + variety_score
         
-        sorted_subjects = sorted(
-            eligible_subjects.items(),
-            key=lambda x: get_priority_score(x[1], x[0]),
-            reverse=True  # Higher priority first
-        )
+        # Score every eligible subject once and keep them in a max-heap (higher priority first).
+        # Ties are broken by subject order, exactly like a stable sort would.
+        priority_heap = [
+            (-get_priority_score(info, subject), order, subject)
+            for order, (subject, info) in enumerate(eligible_subjects.items())
+        ]
+        heapq.heapify(priority_heap)
+        ranked_subjects = []
+        
+        # Iterate subjects by priority, popping from the heap only as far as the caller reads
+        def iter_ranked():
+            pos = 0
+            while pos < len(ranked_subjects) or priority_heap:
+                if pos == len(ranked_subjects):
+                    subject = heapq.heappop(priority_heap)[2]
+                    ranked_subjects.append((subject, eligible_subjects[subject]))
+                yield ranked_subjects[pos]
+                pos += 1
         
         # Allocate study time
-        if available_hours >= split_threshold and len(sorted_subjects) >= 2:
+        if available_hours >= split_threshold and len(eligible_subjects) >= 2:
             # Split between two subjects, ensuring they aren't already scheduled for this day
             selected_subjects = []
             
             # First try to select subjects that haven't been studied for several days
-            for subject, info in sorted_subjects:
-                if subject not in day_subjects[current_date] and len(selected_subjects) < 2:
+            for subject, info in iter_ranked():
+                if len(selected_subjects) == 2:
+                    break
+                if subject not in day_subjects[current_date]:
                     # Add extra check for subjects that haven't been studied recently
                     if (info['last_scheduled'] is None or 
-                        (current_date - info['last_scheduled']).days >= min_days_between):
+                        (current_date - info['last_scheduled']) // _NS_PER_DAY >= min_days_between):
                         selected_subjects.append((subject, info))
             
             # If we couldn't find enough subjects with the spacing constraint, relax it
             if len(selected_subjects) < 2:
-                for subject, info in sorted_subjects:
-                    if subject not in day_subjects[current_date] and len(selected_subjects) < 2 and (subject, info) not in selected_subjects:
+                for subject, info in iter_ranked():
+                    if len(selected_subjects) == 2:
+                        break
+                    if subject not in day_subjects[current_date] and (subject, info) not in selected_subjects:
                         selected_subjects.append((subject, info))
             
             # If we still couldn't find 2 unique subjects, fall back to top priority
@@ -722,13 +958,14 @@ def fill_study_plan(df_exam, df_pre, df_bereits_verplante_stunden,
                 # Make sure we don't add the same subject twice
                 if len(selected_subjects) == 1:
                     subject1, _ = selected_subjects[0]
-                    for subject, info in sorted_subjects:
-                        if subject != subject1 and len(selected_subjects) < 2:
+                    for subject, info in iter_ranked():
+                        if subject != subject1:
                             selected_subjects.append((subject, info))
+                            break
                 
                 # If we still don't have 2 subjects, take top 2 priorities
                 if len(selected_subjects) < 2:
-                    selected_subjects = sorted_subjects[:2]
+                    selected_subjects = list(islice(iter_ranked(), 2))
             
             # Split the time between subjects
             subject1, info1 = selected_subjects[0]
@@ -747,8 +984,8 @@ def fill_study_plan(df_exam, df_pre, df_bereits_verplante_stunden,
                 fairness_ratio = min(0.8, max(0.2, s1_weight))
             
             # Consider exam proximity for ratio calculation
-            days_to_exam1 = max(1, (info1['exam_date'] - current_date).days)
-            days_to_exam2 = max(1, (info2['exam_date'] - current_date).days)
+            days_to_exam1 = max(1, (info1['exam_date'] - current_date) // _NS_PER_DAY)
+            days_to_exam2 = max(1, (info2['exam_date'] - current_date) // _NS_PER_DAY)
             
             # Calculate exam proximity ratio - subject with closer exam gets more time
             total_days = days_to_exam1 + days_to_exam2
@@ -787,27 +1024,26 @@ def fill_study_plan(df_exam, df_pre, df_bereits_verplante_stunden,
                     hours2 = round_to_quarter(available_hours - hours1)
             
             # Update the study plan
-            study_plan.at[idx, 'Lernfach 1'] = subject1
-            study_plan.at[idx, 'Dauer 1'] = hours1
-            study_plan.at[idx, 'Lernfach 2'] = subject2
-            study_plan.at[idx, 'Dauer 2'] = hours2
+            slot_subjects[0][pos] = subject1
+            slot_durations[0][pos] = hours1
+            slot_subjects[1][pos] = subject2
+            slot_durations[1][pos] = hours2
             
             # Update subject tracking
             day_subjects[current_date].add(subject1)
             day_subjects[current_date].add(subject2)
-            daily_schedules[current_date].extend([subject1, subject2])
+            record_schedule(current_date, subject1)
+            record_schedule(current_date, subject2)
             
             # Update remaining hours and tracking info
             subjects_remaining[subject1]['adjusted_remaining'] -= hours1
             subjects_remaining[subject1]['last_scheduled'] = current_date
             subjects_remaining[subject1]['scheduled_count'] += 1
-            subjects_remaining[subject1]['scheduled_dates'].append(current_date)
             scheduled_hours[subject1] += hours1
             
             subjects_remaining[subject2]['adjusted_remaining'] -= hours2
             subjects_remaining[subject2]['last_scheduled'] = current_date
             subjects_remaining[subject2]['scheduled_count'] += 1
-            subjects_remaining[subject2]['scheduled_dates'].append(current_date)
             scheduled_hours[subject2] += hours2
             
         else:
@@ -815,24 +1051,24 @@ def fill_study_plan(df_exam, df_pre, df_bereits_verplante_stunden,
             selected_subject = None
             
             # First try to find a subject that hasn't been studied for min_days_between days
-            for subject, info in sorted_subjects:
+            for subject, info in iter_ranked():
                 if (subject not in day_subjects[current_date] and 
                     (info['last_scheduled'] is None or 
-                     (current_date - info['last_scheduled']).days >= min_days_between) and
+                     (current_date - info['last_scheduled']) // _NS_PER_DAY >= min_days_between) and
                     info['current_streak'] < max_consecutive_days):
                     selected_subject = (subject, info)
                     break
             
             # If no suitable subject found, relax the consecutive days constraint
             if selected_subject is None:
-                for subject, info in sorted_subjects:
+                for subject, info in iter_ranked():
                     if subject not in day_subjects[current_date]:
                         selected_subject = (subject, info)
                         break
             
             # If all eligible subjects are already scheduled today, choose the top priority one
-            if selected_subject is None and sorted_subjects:
-                selected_subject = sorted_subjects[0]
+            if selected_subject is None and eligible_subjects:
+                selected_subject = next(iter_ranked())
             elif selected_subject is None:
                 continue
                 
@@ -841,98 +1077,388 @@ def fill_study_plan(df_exam, df_pre, df_bereits_verplante_stunden,
             hours = round_to_quarter(hours_raw)
             
             # Update the study plan
-            study_plan.at[idx, 'Lernfach 1'] = subject
-            study_plan.at[idx, 'Dauer 1'] = hours
+            slot_subjects[0][pos] = subject
+            slot_durations[0][pos] = hours
             
             # Update subject tracking
             day_subjects[current_date].add(subject)
-            daily_schedules[current_date].append(subject)
+            record_schedule(current_date, subject)
             
             # Update remaining hours and tracking info
             subjects_remaining[subject]['adjusted_remaining'] -= hours
             subjects_remaining[subject]['last_scheduled'] = current_date
             subjects_remaining[subject]['scheduled_count'] += 1
-            subjects_remaining[subject]['scheduled_dates'].append(current_date)
             scheduled_hours[subject] += hours
     
     # Do a final update of consecutive days tracking
     if last_date is not None:
         update_consecutive_days(last_date)
     
-    # Calculate final stats for reporting
-    final_stats = {}
-    for subject, info in subjects_remaining.items():
-        total_scheduled = scheduled_hours[subject] + info['already_planned']
-        
-        final_stats[subject] = {
-            'target_hours': info['target_hours'],
-            'scheduled_hours': total_scheduled,
-            'percentage': (total_scheduled / info['target_hours']) * 100 if info['target_hours'] > 0 else 100,
-            'shortfall': info['target_hours'] - total_scheduled
-        }
-    
-    # Add completion percentage as metadata
+    return _finish_study_plan(study_plan, grid, subjects_remaining, scheduled_hours, max_consecutive_days)
+
+
+def _finish_study_plan(study_plan, grid, subjects_remaining, scheduled_hours, max_consecutive_days):
+    """Write the allocated grid back into the plan and attach the completion, fairness and diversity metrics."""
+    # Write the allocated slots back into the frame in one go
+    _store_plan_grid(study_plan, grid)
+    
+    # Calculate final stats for reporting, one array entry per subject
+    subjects = list(subjects_remaining)
+    final_stats, fairness_metrics = _fairness_metrics(
+        subjects,
+        [subjects_remaining[subject]['target_hours'] for subject in subjects],
+        [scheduled_hours[subject] + subjects_remaining[subject]['already_planned'] for subject in subjects])
+    
+    # Add completion percentage and the fairness of the distribution as metadata
     study_plan.attrs['completion_stats'] = final_stats
-    
-    # Check fairness of distribution
-    percentages = [stats['percentage'] for subject, stats in final_stats.items()]
-    fairness_metrics = {
-        'min_percentage': min(percentages) if percentages else 0,
-        'max_percentage': max(percentages) if percentages else 0,
-        'avg_percentage': sum(percentages) / len(percentages) if percentages else 0,
-        'std_deviation': np.std(percentages) if percentages else 0
-    }
     study_plan.attrs['fairness_metrics'] = fairness_metrics
     
     # Calculate diversity metrics - how well subjects are mixed
-    subject_sequences = []
-    last_subject = None
-    sequence_length = 0
-    
-    # Go through the study plan chronologically and track subject sequences
-    for _, day in study_plan.sort_values(by='Datum').iterrows():
-        subjects_today = []
-        if pd.notna(day['Lernfach 1']):
-            subjects_today.append(day['Lernfach 1'])
-        if pd.notna(day['Lernfach 2']):
-            subjects_today.append(day['Lernfach 2'])
-        if pd.notna(day['Lernfach 3']):
-            subjects_today.append(day['Lernfach 3'])
-        
-        for subject in subjects_today:
-            if subject == last_subject:
-                sequence_length += 1
-            else:
-                if last_subject is not None:
-                    subject_sequences.append(sequence_length)
-                last_subject = subject
-                sequence_length = 1
-    
-    # Add the last sequence
-    if last_subject is not None and sequence_length > 0:
-        subject_sequences.append(sequence_length)
-    
-    # Calculate metrics about subject sequences
-    if subject_sequences:
-        diversity_metrics = {
-            'max_consecutive_days': max(subject_sequences),
-            'avg_consecutive_days': sum(subject_sequences) / len(subject_sequences),
-            'long_sequences_count': sum(1 for seq in subject_sequences if seq > max_consecutive_days)
-        }
-    else:
-        diversity_metrics = {
-            'max_consecutive_days': 0,
-            'avg_consecutive_days': 0,
-            'long_sequences_count': 0
-        }
+    diversity_metrics = _diversity_metrics(study_plan, max_consecutive_days)
     
     study_plan.attrs['diversity_metrics'] = diversity_metrics
     
     return study_plan
 
+
+# Allocation engines of fill_study_plan
+FILL_ENGINES = ('greedy', 'optimize')
+
+
+def _edf_allocate(demand, allocation, day_capacity, day_slots, day_eligible, windows, limits=None):
+    """
+    Assign quarter hours day by day to the eligible subject with the earliest exam
+    (earliest-deadline-first) until its demand is met.
+    
+    demand, day_capacity and day_slots are updated in place, allocation[s] maps each
+    day position to the quarters subject s gets on that day. A subject that already
+    has hours on a day does not take another of its slots. Returns True if all
+    demands were met.
+    
+    A subject that takes the last free slot of a day gets all of the day's hours,
+    up to limits[s] quarters (default: its demand), since nobody else could use
+    them; the extra hours count towards its demand.
+    
+    When the sweep reaches a reserved day (day_eligible[d] is a set of subjects), it
+    serves those subjects first, like the greedy engine does; what is left of the day
+    is shared like any other. Without reserved days and slot limits the windows are
+    intervals, and serving the earliest deadline first meets every demand that can
+    be met at all (Glover's greedy matching for convex bipartite graphs).
+    """
+    if limits is None:
+        limits = list(demand)
+    
+    def assign(d, s):
+        if d not in allocation[s]:
+            if day_slots[d] <= 0:
+                return
+            day_slots[d] -= 1
+        quarters = min(day_capacity[d], demand[s])
+        if day_slots[d] == 0:
+            quarters = min(day_capacity[d], max(quarters, limits[s]))
+        allocation[s][d] = allocation[s].get(d, 0) + quarters
+        day_capacity[d] -= quarters
+        demand[s] -= quarters
+        limits[s] -= quarters
+    
+    by_start = sorted(range(len(windows)), key=lambda s: windows[s][0])
+    heap = []
+    next_start = 0
+    
+    for d in range(len(day_capacity)):
+        while next_start < len(by_start) and windows[by_start[next_start]][0] <= d:
+            s = by_start[next_start]
+            if demand[s] > 0:
+                heapq.heappush(heap, (windows[s][1], s))
+            next_start += 1
+        
+        # A reserved day serves its exam subject(s) first
+        if day_eligible[d] is not None:
+            for s in sorted(day_eligible[d], key=lambda s: windows[s][1]):
+                if day_capacity[d] > 0 and demand[s] > 0 and windows[s][0] <= d <= windows[s][1]:
+                    assign(d, s)
+        
+        # Subjects that need a slot on a day without free slots wait for the next day
+        zurueckgestellt = []
+        while heap and day_capacity[d] > 0:
+            ende, s = heap[0]
+            if ende < d or demand[s] <= 0:
+                heapq.heappop(heap)
+                continue
+            if d not in allocation[s] and day_slots[d] <= 0:
+                zurueckgestellt.append(heapq.heappop(heap))
+                continue
+            assign(d, s)
+        for eintrag in zurueckgestellt:
+            heapq.heappush(heap, eintrag)
+    
+    return all(rest <= 0 for rest in demand)
+
+
+def _optimize_allocation(grid, subjects_remaining, dedicated_study_days, split_threshold):
+    """
+    Allocate the free hours of the plan grid as an optimization over subject x day.
+    
+    Works in whole quarter hours and respects the study window of every subject
+    (Lernstart up to the exam), the free capacity of each day, the days reserved
+    before exams and the number of subjects per day (two from split_threshold
+    hours on, else one, and never more than the free slots). A reserved day first
+    serves its exam subject(s), which take their own slots, and shares the rest
+    of its hours like greedy does. The allocation
+    1. maximizes the completion levels lexicographically (max-min fairness): all
+       subjects are raised together to the highest level every one of them can
+       reach (found by bisection, each step checking with _edf_allocate), subjects
+       that cannot get another quarter hour at that level are fixed there, and the
+       others are raised further, and
+    2. then spends the remaining capacity on the remaining target hours.
+    Guarantee: where neither the reserved days nor the subjects-per-day limit bind,
+    the lowest level is the optimum of the linear program over windows and day
+    capacities, up to one quarter hour per subject (EDF is exact for interval
+    windows). Reserved days and the limit are handled heuristically: the sweep
+    serves a reserved day's subject first, and the subject taking a day's last slot
+    gets all of its hours. tests/test_fill_engines.py checks the LP bound and that
+    the lowest completion never falls below the greedy engine's on synthetic inputs.
+    
+    Fills the grid in place and returns the newly scheduled hours per subject.
+    """
+    day_dates = grid['dates']
+    n_days = len(day_dates)
+    subjects = list(subjects_remaining)
+    
+    # Reserved days first serve their exam subject(s)
+    position = {datum: pos for pos, datum in enumerate(day_dates)}
+    day_eligible = [None] * n_days
+    for datum, eintrag in dedicated_study_days.items():
+        reserviert = {subjects.index(fach.strip()) for fach in eintrag.split(',') if fach.strip() in subjects_remaining}
+        day_eligible[position[datum]] = reserviert
+    
+    # Free quarter hours and free slots per day; the reserved subjects get slots on top of the limit
+    base_capacity, base_slots = [], []
+    for pos in range(n_days):
+        if grid['hours'][pos] <= 0 or grid['has_exam'][pos]:
+            base_capacity.append(0)
+            base_slots.append(0)
+            continue
+        geplant = sum(grid['durations'][i][pos] for i in range(3)
+                      if not grid['empty'][i][pos] and grid['durations'][i][pos] > 0)
+        frei = [i for i in range(3) if grid['empty'][i][pos] or grid['durations'][i][pos] == 0]
+        limit = 2 if grid['hours'][pos] >= split_threshold else 1
+        if day_eligible[pos]:
+            limit += len(day_eligible[pos])
+        base_capacity.append(max(0, int((grid['hours'][pos] - geplant) * 4 + 1e-9)))
+        base_slots.append(min(limit, len(frei)))
+    
+    # Study window of each subject as day positions (dates are sorted)
+    day_index = np.asarray(day_dates, dtype=np.int64)
+    windows = []
+    for subject in subjects:
+        info = subjects_remaining[subject]
+        windows.append((int(np.searchsorted(day_index, info['start_date'], side='left')),
+                        int(np.searchsorted(day_index, info['exam_date'], side='right')) - 1))
+    
+    # Quarter hours still needed per subject and the quarters needed to reach a completion level
+    remaining = [int(round(subjects_remaining[s]['remaining_hours'] * 4)) for s in subjects]
+    
+    def quarters_for(k, level):
+        info = subjects_remaining[subjects[k]]
+        bedarf = level * info['target_hours'] - info['already_planned']
+        return min(remaining[k], max(0, int(np.ceil(bedarf * 4 - 1e-9))))
+    
+    def allocate(demand):
+        allocation = [{} for _ in subjects]
+        capacity, slots = list(base_capacity), list(base_slots)
+        ok = _edf_allocate(list(demand), allocation, capacity, slots, day_eligible, windows, list(remaining))
+        return ok, allocation, capacity, slots
+    
+    # 1. Max-min fairness: raise the free subjects together, fix the ones that cannot grow
+    fixed = [None] * len(subjects)
+    
+    def demand_at(level):
+        return [fixed[k] if fixed[k] is not None else quarters_for(k, level) for k in range(len(subjects))]
+    
+    low = 0.0
+    result = allocate(demand_at(low))
+    while any(f is None for f in fixed):
+        if allocate(demand_at(1.0))[0]:
+            low = 1.0
+        else:
+            high = 1.0
+            for _ in range(30):
+                if high - low < 1e-4:
+                    break
+                mid = (low + high) / 2
+                if allocate(demand_at(mid))[0]:
+                    low = mid
+                else:
+                    high = mid
+        demand = demand_at(low)
+        result = allocate(demand)
+        if low >= 1.0:
+            break
+        
+        # Subjects that cannot get one more quarter hour with the others kept where they are
+        gesperrt = []
+        for k in range(len(subjects)):
+            if fixed[k] is not None:
+                continue
+            if demand[k] >= remaining[k]:
+                gesperrt.append(k)
+                continue
+            mehr = list(demand)
+            mehr[k] += 1
+            if not allocate(mehr)[0]:
+                gesperrt.append(k)
+        if not gesperrt:
+            # Every subject could grow alone but not all together: stop at this level
+            break
+        for k in gesperrt:
+            fixed[k] = demand[k]
+    ok, allocation, capacity, slots = result
+    
+    # 2. Spend what is left on the rest of the target hours
+    rest = [remaining[k] - sum(allocation[k].values()) for k in range(len(subjects))]
+    _edf_allocate(rest, allocation, capacity, slots, day_eligible, windows)
+    
+    # Write the allocation into the grid: add to a slot the subject already has that day, else use a free one
+    scheduled_hours = {subject: 0 for subject in subjects}
+    for k, subject in enumerate(subjects):
+        for pos, quarters in sorted(allocation[k].items()):
+            hours = quarters / 4
+            slot = next((i for i in range(3) if not grid['empty'][i][pos] and grid['subjects'][i][pos] == subject
+                         and grid['durations'][i][pos] > 0), None)
+            if slot is None:
+                slot = next(i for i in range(3) if grid['empty'][i][pos] or grid['durations'][i][pos] == 0)
+                grid['subjects'][slot][pos] = subject
+                grid['durations'][slot][pos] = hours
+                grid['empty'][slot][pos] = False
+            else:
+                grid['durations'][slot][pos] += hours
+            scheduled_hours[subject] += hours
+    
+    return scheduled_hours
+
+
 #----------------------------------------------------------------------------------
 
-def generate_complete_study_plan(df_exam, df_plan, settings=None):
+# Standardeinstellungen für generate_complete_study_plan
+DEFAULT_SETTINGS = {
+    'split_threshold': 4.0,
+    'split_ratio': 0.5,
+    'exam_proximity_weight': 3.0,
+    'fairness_weight': 2.5,
+    'min_days_between': 2,
+    'max_consecutive_days': 2,
+    'dedicated_days_before_exam': 2,
+    'wiederhol_dauer': 0.25,
+    'engine': 'greedy'
+}
+
+# Exam and weekly plan columns that determine a plan
+_EXAM_KEY_COLUMNS = ['Fachname', 'Prüfungsdatum', 'Schwierigkeit', 'Start', 'Kategorie']
+_PLAN_KEY_COLUMNS = ['Tag', 'Lernzeit (h)']
+
+
+def _plan_inputs(df_exam, df_plan, settings):
+    """Capture the raw inputs of a plan as plain records."""
+    exam_columns = [col for col in _EXAM_KEY_COLUMNS if col in df_exam.columns]
+    return {
+        'exams': df_exam[exam_columns].to_dict('records'),
+        'plan': df_plan[_PLAN_KEY_COLUMNS].to_dict('records'),
+        'settings': dict(settings),
+    }
+
+
+def _fill_settings(settings):
+    """Pick the keyword arguments of fill_study_plan from a settings dict."""
+    return {
+        'split_threshold': settings['split_threshold'],
+        'split_ratio': settings['split_ratio'],
+        'exam_proximity_weight': settings['exam_proximity_weight'],
+        'fairness_weight': settings['fairness_weight'],
+        'min_days_between': settings['min_days_between'],
+        'max_consecutive_days': settings['max_consecutive_days'],
+        'dedicated_days_before_exam': settings['dedicated_days_before_exam'],
+        'engine': settings['engine']
+    }
+
+
+def _sammle_statistiken(df_lernplan_final, gesamtstunden, gesamttage, df_exam):
+    """Collect the overall statistics dict returned next to a finished plan."""
+    # Endgültige Verteilung der Lernzeiten berechnen
+    final_stats = df_lernplan_final.attrs.get('completion_stats', {})
+    fairness_metrics = df_lernplan_final.attrs.get('fairness_metrics', {})
+    diversity_metrics = df_lernplan_final.attrs.get('diversity_metrics', {})
+    
+    # Gesamtstatistiken berechnen
+    return {
+        'Gesamte verfügbare Lernzeit (h)': gesamtstunden,
+        'Gesamtzahl der Tage im Lernplan': gesamttage,
+        'Anzahl der Prüfungsfächer': len(df_exam),
+        'Fairness-Metriken': fairness_metrics,
+        'Diversitäts-Metriken': diversity_metrics,
+        'Fach-Statistiken': final_stats
+    }
+
+
+def _frame_form(df):
+    """Shape of a DataFrame as [rows, columns]."""
+    return [int(df.shape[0]), int(df.shape[1])]
+
+
+# Number of SCHRITT stages reported to progress callbacks
+ANZAHL_SCHRITTE = 8
+
+
+class PlanGenerationCancelled(Exception):
+    """Raised by generate_complete_study_plan when its cancel event is set between two stages."""
+
+
+class _StufenProfil:
+    """
+    Follows the SCHRITT stages: records wall time and input/output frame sizes (if
+    messen), reports finished stages to a progress callback and stops the pipeline
+    when a cancel event is set.
+    """
+    
+    def __init__(self, messen=True, progress=None, cancel=None):
+        self.stufen = []
+        self.messen = messen
+        self._progress = progress
+        self._cancel = cancel
+        self._fertig = 0
+        self._start_gesamt = time.perf_counter()
+        self._start = None
+        self._eingabe = None
+    
+    def beginne(self, *frames):
+        if self._cancel is not None and self._cancel.is_set():
+            raise PlanGenerationCancelled(f"Cancelled before stage {self._fertig + 1} of {ANZAHL_SCHRITTE}")
+        if self.messen:
+            self._eingabe = [_frame_form(df) for df in frames]
+            self._start = time.perf_counter()
+    
+    def beende(self, name, *frames):
+        if self.messen:
+            dauer = time.perf_counter() - self._start
+            self.stufen.append({
+                'Stufe': name,
+                'Zeit (s)': dauer,
+                'Eingabe (Zeilen, Spalten)': self._eingabe,
+                'Ausgabe (Zeilen, Spalten)': [_frame_form(df) for df in frames],
+            })
+        self._fertig += 1
+        if self._progress is not None:
+            self._progress(self._fertig, ANZAHL_SCHRITTE, name)
+    
+    def ergebnis(self):
+        return {
+            'Gesamtzeit (s)': time.perf_counter() - self._start_gesamt,
+            'Stufen': self.stufen,
+        }
+
+
+def generate_complete_study_plan(df_exam, df_plan, settings=None, profile=False, profile_path=None,
+                                 progress=None, cancel=None, copy_stages=False):
     """
     Hauptfunktion zum Generieren eines kompletten Lernplans basierend auf Prüfungsdaten und Zeitplaneinstellungen.
     
@@ -961,6 +1487,30 @@ def generate_complete_study_plan(df_exam, df_plan, settings=None):
         - max_consecutive_days: Maximale aufeinanderfolgende Tage für dasselbe Fach (default: 2)
         - dedicated_days_before_exam: Anzahl der Tage vor einer Prüfung, die für das Prüfungsfach reserviert werden (default: 2)
         - wiederhol_dauer: Dauer der täglichen Wiederholungen in Stunden (default: 0.5)
+        - engine: Verteilung der restlichen Stunden, 'greedy' (Heuristik) oder 'optimize'
+          (maximiert die niedrigste Zielerreichung, dann die verplanten Stunden) (default: 'greedy')
+    
+    profile : bool, optional
+        Wenn True, werden Laufzeit sowie Ein- und Ausgabegrößen (Zeilen, Spalten) jedes
+        Schritts (SCHRITT 1-8) unter 'Laufzeit-Profil' in den Statistiken abgelegt (default: False)
+    
+    profile_path : str, optional
+        Pfad, unter dem ein cProfile-Dump des gesamten Aufrufs gespeichert wird
+        (auswertbar mit pstats bzw. snakeviz) (default: None)
+    
+    progress : callable, optional
+        Wird nach jedem Schritt mit (erledigte Schritte, ANZAHL_SCHRITTE, Name des Schritts)
+        aufgerufen, z. B. für einen Fortschrittsbalken (default: None)
+    
+    cancel : threading.Event, optional
+        Ist das Event gesetzt, bricht die Generierung vor dem nächsten Schritt mit
+        PlanGenerationCancelled ab (default: None)
+    
+    copy_stages : bool, optional
+        Standardmäßig wird der Lernplan nur einmal angelegt (als Kopie des Kalenders) und
+        dann von allen Schritten direkt bearbeitet; die Prüfungsdaten werden einmal in
+        cleanup_exam_data kopiert. Mit True erzeugt jeder Schritt wie früher eine eigene
+        Kopie, z. B. zum Vergleich des Speicherbedarfs (default: False)
     
     Returns:
     --------
@@ -969,36 +1519,49 @@ def generate_complete_study_plan(df_exam, df_plan, settings=None):
     dict
         Zusätzliche Statistiken und Metriken zum erstellten Lernplan
     """
+    if profile_path is None:
+        return _generate_complete_study_plan(df_exam, df_plan, settings, profile, progress, cancel, copy_stages)
+    
+    # Only imported when a dump is requested, to keep the module import cheap
+    import cProfile
+    
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        return _generate_complete_study_plan(df_exam, df_plan, settings, profile, progress, cancel, copy_stages)
+    finally:
+        profiler.disable()
+        profiler.dump_stats(profile_path)
+
+
+def _generate_complete_study_plan(df_exam, df_plan, settings, profile, progress=None, cancel=None,
+                                  copy_stages=False):
+    """Run the SCHRITT 1-8 pipeline of generate_complete_study_plan."""
+    # The stages work on frames the pipeline owns, unless every stage should copy
+    inplace = not copy_stages
+    
+    if profile or progress is not None or cancel is not None:
+        profil = _StufenProfil(profile, progress, cancel)
+    else:
+        profil = None
+    
     # Standardeinstellungen definieren, falls nicht vorhanden
     if settings is None:
-        settings = {
-            'split_threshold': 4.0,
-            'split_ratio': 0.5,
-            'exam_proximity_weight': 3.0,
-            'fairness_weight': 2.5,
-            'min_days_between': 2,
-            'max_consecutive_days': 2,
-            'dedicated_days_before_exam': 2,
-            'wiederhol_dauer': 0.25
-        }
+        settings = dict(DEFAULT_SETTINGS)
     else:
         # Fehlende Einstellungen mit Standardwerten ergänzen
-        default_settings = {
-            'split_threshold': 4.0,
-            'split_ratio': 0.5,
-            'exam_proximity_weight': 3.0,
-            'fairness_weight': 2.5,
-            'min_days_between': 2,
-            'max_consecutive_days': 2,
-            'dedicated_days_before_exam': 2,
-            'wiederhol_dauer': 0.25
-        }
-        for key, value in default_settings.items():
+        for key, value in DEFAULT_SETTINGS.items():
             if key not in settings:
                 settings[key] = value
     
+    # Rohe Eingaben festhalten, bevor die Vorbereitung die DataFrames verändert
+    plan_inputs = _plan_inputs(df_exam, df_plan, settings)
+    
     # SCHRITT 1: Daten vorbereiten
     # ----------------------------
+    if profil is not None:
+        profil.beginne(df_exam, df_plan)
+    
     # Prüfungsdaten vorbereiten
     df_exam = prepare_exams(df_exam)
     
@@ -1011,44 +1574,69 @@ def generate_complete_study_plan(df_exam, df_plan, settings=None):
     # Prüfungsdaten bereinigen
     df_exam = cleanup_exam_data(df_exam)
     
+    if profil is not None:
+        profil.beende('SCHRITT 1: Daten vorbereiten', df_exam, df_plan)
+        profil.beginne(df_exam, df_plan)
+    
     # SCHRITT 2: Kalender erstellen
     # -----------------------------
     # Gesamte Lernzeit berechnen
     gesamtstunden, gesamttage, df_kalender = berechne_gesamt_lernzeit(df_exam, df_plan)
     
     # Prüfungstage im Kalender markieren
-    df_kalender = erweitere_kalender_mit_pruefungstagen(df_kalender, df_exam)
+    df_kalender = erweitere_kalender_mit_pruefungstagen(df_kalender, df_exam, inplace=inplace)
     
     # Zielstunden pro Fach berechnen
-    df_exam = berechne_zielstunden(df_exam, df_kalender)
+    df_exam = berechne_zielstunden(df_exam, df_kalender, inplace=inplace)
+    
+    if profil is not None:
+        profil.beende('SCHRITT 2: Kalender erstellen', df_kalender, df_exam)
+        profil.beginne(df_kalender)
     
     # SCHRITT 3: Lernplan initialisieren
     # ----------------------------------
     # Lernfachspalten im Kalender vorbereiten
-    df_lernplan = erstelle_fächer(df_kalender)
+    df_lernplan = erstelle_fächer(df_kalender, inplace=inplace)
     
     # Freie Zeit im Kalender aktualisieren
-    df_lernplan = aktualisiere_freie_zeit(df_lernplan)
+    df_lernplan = aktualisiere_freie_zeit(df_lernplan, inplace=inplace)
+    
+    if profil is not None:
+        profil.beende('SCHRITT 3: Lernplan initialisieren', df_lernplan)
+        profil.beginne(df_lernplan)
     
     # SCHRITT 4: Vortage vor Prüfungen planen
     # ---------------------------------------
     # Tage vor Prüfungen mit den Prüfungsfächern füllen
-    df_lernplan = fülle_vortage_aller_prüfungen(df_lernplan)
+    df_lernplan = fülle_vortage_aller_prüfungen(df_lernplan, inplace=inplace)
     
     # Freie Zeit nach der Vortagsplanung aktualisieren
-    df_lernplan = aktualisiere_freie_zeit(df_lernplan)
+    df_lernplan = aktualisiere_freie_zeit(df_lernplan, inplace=inplace)
+    
+    if profil is not None:
+        profil.beende('SCHRITT 4: Vortage vor Prüfungen planen', df_lernplan)
+        profil.beginne(df_lernplan, df_exam)
     
     # SCHRITT 5: Tägliche Wiederholungen planen (für Anki und Sprachen)
     # -----------------------------------------------------------------
-    df_lernplan = plane_daily_reviews(df_lernplan, df_exam, wiederhol_dauer=settings['wiederhol_dauer'])
+    df_lernplan = plane_daily_reviews(df_lernplan, df_exam, wiederhol_dauer=settings['wiederhol_dauer'],
+                                      inplace=inplace)
     
     # Freie Zeit nach den täglichen Wiederholungen aktualisieren
-    df_lernplan = aktualisiere_freie_zeit(df_lernplan)
+    df_lernplan = aktualisiere_freie_zeit(df_lernplan, inplace=inplace)
+    
+    if profil is not None:
+        profil.beende('SCHRITT 5: Tägliche Wiederholungen planen', df_lernplan)
+        profil.beginne(df_lernplan)
     
     # SCHRITT 6: Aktuelle Lernzeiten pro Fach berechnen
     # -------------------------------------------------
     df_bereits_verplante_stunden = get_total_study_time_by_subject(df_lernplan)
     
+    if profil is not None:
+        profil.beende('SCHRITT 6: Aktuelle Lernzeiten berechnen', df_bereits_verplante_stunden)
+        profil.beginne(df_exam, df_lernplan)
+    
     # SCHRITT 7: Restlichen Lernplan füllen
     # -------------------------------------
     # Lernplan mit den verbleibenden Stunden füllen
@@ -1056,35 +1644,1296 @@ def generate_complete_study_plan(df_exam, df_plan, settings=None):
         df_exam, 
         df_lernplan, 
         df_bereits_verplante_stunden,
-        split_threshold=settings['split_threshold'],
-        split_ratio=settings['split_ratio'],
-        exam_proximity_weight=settings['exam_proximity_weight'],
-        fairness_weight=settings['fairness_weight'],
-        min_days_between=settings['min_days_between'],
-        max_consecutive_days=settings['max_consecutive_days'],
-        dedicated_days_before_exam=settings['dedicated_days_before_exam']
+        inplace=inplace,
+        **_fill_settings(settings)
     )
     
+    if profil is not None:
+        profil.beende('SCHRITT 7: Restlichen Lernplan füllen', df_lernplan_final)
+        profil.beginne(df_lernplan_final)
+    
     # SCHRITT 8: Statistiken und Metriken sammeln
     # -------------------------------------------
-    # Endgültige Verteilung der Lernzeiten berechnen
-    final_stats = df_lernplan_final.attrs.get('completion_stats', {})
-    fairness_metrics = df_lernplan_final.attrs.get('fairness_metrics', {})
-    diversity_metrics = df_lernplan_final.attrs.get('diversity_metrics', {})
+    gesamt_stats = _sammle_statistiken(df_lernplan_final, gesamtstunden, gesamttage, df_exam)
     
-    # Gesamtstatistiken berechnen
-    gesamt_stats = {
-        'Gesamte verfügbare Lernzeit (h)': gesamtstunden,
-        'Gesamtzahl der Tage im Lernplan': gesamttage,
-        'Anzahl der Prüfungsfächer': len(df_exam),
-        'Fairness-Metriken': fairness_metrics,
-        'Diversitäts-Metriken': diversity_metrics,
-        'Fach-Statistiken': final_stats
-    }
+    if profil is not None:
+        profil.beende('SCHRITT 8: Statistiken sammeln')
+        if profil.messen:
+            gesamt_stats['Laufzeit-Profil'] = profil.ergebnis()
+    
+    # Eingaben für spätere Teilneuplanungen (update_plan) am Lernplan vermerken
+    df_lernplan_final.attrs['plan_inputs'] = plan_inputs
     
     return df_lernplan_final, gesamt_stats
 
 
+# -------------------------------------------------------------------------------
+# SECTION 4: BATCH GENERATION
+# -------------------------------------------------------------------------------
+
+def _generate_plan_safely(eingabe):
+    """Generate one plan for the batch API and return errors instead of raising."""
+    # Copies, so that inline runs (workers=1, thread pools) leave the caller's frames unchanged
+    df_exam, df_plan = eingabe[0].copy(), eingabe[1].copy()
+    settings = eingabe[2] if len(eingabe) > 2 else None
+    try:
+        df_lernplan, gesamt_stats = generate_complete_study_plan(df_exam, df_plan, settings)
+        return df_lernplan, gesamt_stats, None
+    except Exception as e:
+        return None, None, f"{type(e).__name__}: {e}"
+
+
+def generate_study_plans_batch(inputs, workers=None, chunksize=None, executor=None):
+    """
+    Generate study plans for many inputs in parallel in a process pool.
+    
+    Parameters:
+    -----------
+    inputs : iterable
+        Inputs as tuples (df_exam, df_plan) or (df_exam, df_plan, settings),
+        each as for generate_complete_study_plan.
+    
+    workers : int, optional
+        Number of worker processes (default: number of CPU cores). With 1 no pool is used.
+    
+    chunksize : int, optional
+        Number of inputs sent to a worker per task (default: automatic).
+    
+    executor : concurrent.futures.Executor, optional
+        Existing pool to reuse, e.g. across several batches. It is not shut down.
+    
+    Returns:
+    --------
+    list
+        One tuple (df_lernplan, gesamt_stats, fehler) per input, in input order.
+        On success fehler is None; otherwise plan and statistics are None and fehler
+        holds the error message.
+    """
+    inputs = list(inputs)
+    if not inputs:
+        return []
+    
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(inputs)))
+    
+    if executor is None and workers == 1:
+        return [_generate_plan_safely(eingabe) for eingabe in inputs]
+    
+    # Several inputs per task keep the pickling overhead low; the same worker
+    # processes handle all chunks of the batch
+    if chunksize is None:
+        chunksize = max(1, len(inputs) // (workers * 4))
+    
+    if executor is not None:
+        return list(executor.map(_generate_plan_safely, inputs, chunksize=chunksize))
+    
+    # The process pool pulls in multiprocessing, which the Streamlit pages never need
+    from concurrent.futures import ProcessPoolExecutor
+    
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_generate_plan_safely, inputs, chunksize=chunksize))
+
+
+# -------------------------------------------------------------------------------
+# SECTION 5: PLAN CACHE
+# -------------------------------------------------------------------------------
+
+PlanCacheInfo = namedtuple("PlanCacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+_plan_cache = OrderedDict()
+_plan_cache_lock = threading.Lock()
+_plan_cache_stats = {'hits': 0, 'misses': 0}
+_plan_cache_maxsize = 32
+
+
+def _canonical_value(value):
+    """Turn a cell or setting value into a JSON-stable representation."""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, (pd.Timestamp, datetime, np.datetime64)) or hasattr(value, 'isoformat'):
+        return pd.Timestamp(value).isoformat()
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return float(value)
+    return str(value)
+
+
+def plan_fingerprint(df_exam, df_plan, settings=None, today=None):
+    """
+    Compute a stable hash over all inputs that determine a study plan.
+    
+    It covers the exam rows (in their order), the study hours per weekday, the
+    settings completed with their defaults and today's date, because the study start
+    "Jetzt" depends on it. Exam dates count as dates, whether they are passed as text
+    or as Timestamp.
+    """
+    if today is None:
+        today = pd.Timestamp.today().normalize()
+    merged_settings = dict(DEFAULT_SETTINGS)
+    merged_settings.update(settings or {})
+    
+    # The pipeline parses the exam dates itself, so strings and Timestamps of the same day are equal
+    if 'Prüfungsdatum' in df_exam.columns:
+        try:
+            df_exam = df_exam.assign(Prüfungsdatum=pd.to_datetime(df_exam['Prüfungsdatum']))
+        except (ValueError, TypeError):
+            pass
+    
+    payload = {
+        'exams': [
+            [_canonical_value(row.get(col)) for col in _EXAM_KEY_COLUMNS]
+            for row in df_exam.to_dict('records')
+        ],
+        'plan': [
+            [_canonical_value(row.get(col)) for col in _PLAN_KEY_COLUMNS]
+            for row in df_plan.to_dict('records')
+        ],
+        'settings': {key: _canonical_value(value) for key, value in merged_settings.items()},
+        'today': pd.Timestamp(today).date().isoformat(),
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def generate_complete_study_plan_cached(df_exam, df_plan, settings=None, maxsize=None, progress=None, cancel=None):
+    """
+    Like generate_complete_study_plan, but with a process-wide LRU cache.
+    
+    The cache is keyed by plan_fingerprint, so calling again with unchanged inputs
+    only costs a lookup. The inputs are not modified, and copies of the cached plan
+    are returned.
+    
+    maxsize : int, optional
+        Maximum number of cached plans; changes the size for all following calls.
+    
+    progress, cancel : optional
+        Passed on to generate_complete_study_plan; a cancelled run is not cached.
+    """
+    global _plan_cache_maxsize
+    
+    key = plan_fingerprint(df_exam, df_plan, settings)
+    with _plan_cache_lock:
+        if maxsize is not None:
+            _plan_cache_maxsize = max(0, maxsize)
+        entry = _plan_cache.get(key)
+        if entry is not None:
+            _plan_cache.move_to_end(key)
+            _plan_cache_stats['hits'] += 1
+        else:
+            _plan_cache_stats['misses'] += 1
+    
+    if entry is None:
+        entry = generate_complete_study_plan(
+            df_exam.copy(), df_plan.copy(), dict(settings) if settings is not None else None,
+            progress=progress, cancel=cancel
+        )
+        _plan_cache_put(key, entry)
+    
+    df_lernplan, gesamt_stats = entry
+    return df_lernplan.copy(), copy.deepcopy(gesamt_stats)
+
+
+def _plan_cache_put(key, entry):
+    """Insert an entry as the most recently used one and evict beyond maxsize."""
+    with _plan_cache_lock:
+        _plan_cache[key] = entry
+        _plan_cache.move_to_end(key)
+        while len(_plan_cache) > _plan_cache_maxsize:
+            _plan_cache.popitem(last=False)
+
+
+def peek_cached_plan(df_exam, df_plan, settings=None):
+    """Return copies of the cached plan and stats for these inputs, or None; never generates a plan."""
+    key = plan_fingerprint(df_exam, df_plan, settings)
+    with _plan_cache_lock:
+        entry = _plan_cache.get(key)
+        if entry is None:
+            return None
+        _plan_cache.move_to_end(key)
+        _plan_cache_stats['hits'] += 1
+    
+    df_lernplan, gesamt_stats = entry
+    return df_lernplan.copy(), copy.deepcopy(gesamt_stats)
+
+
+def put_cached_plan(df_exam, df_plan, settings, df_lernplan, gesamt_stats):
+    """Put a plan generated elsewhere (e.g. loaded from a PlanStore) into the cache under its inputs."""
+    key = plan_fingerprint(df_exam, df_plan, settings)
+    _plan_cache_put(key, (df_lernplan.copy(), copy.deepcopy(gesamt_stats)))
+
+
+class PlanJob:
+    """
+    Generate a study plan with generate_complete_study_plan_cached in a background thread.
+    
+    key is the plan_fingerprint of the inputs, progress the last reported
+    (steps done, ANZAHL_SCHRITTE, step name). cancel() stops the generation before
+    its next step; cancelled is True afterwards. If the generation fails, error
+    holds the message.
+    """
+    
+    def __init__(self, df_exam, df_plan, settings=None):
+        self.key = plan_fingerprint(df_exam, df_plan, settings)
+        self.progress = (0, ANZAHL_SCHRITTE, None)
+        self.cancelled = False
+        self.error = None
+        self._result = None
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(df_exam.copy(), df_plan.copy(), dict(settings) if settings is not None else None),
+            daemon=True,
+        )
+        self._thread.start()
+    
+    def _run(self, df_exam, df_plan, settings):
+        try:
+            self._result = generate_complete_study_plan_cached(
+                df_exam, df_plan, settings, progress=self._report, cancel=self._cancel
+            )
+        except PlanGenerationCancelled:
+            self.cancelled = True
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+    
+    def _report(self, schritt, anzahl, name):
+        self.progress = (schritt, anzahl, name)
+    
+    def cancel(self):
+        """Ask the job to stop before its next stage."""
+        self._cancel.set()
+    
+    def done(self):
+        return not self._thread.is_alive()
+    
+    def result(self, timeout=None):
+        """Wait for the job and return (df_lernplan, gesamt_stats), or None if it was cancelled or failed."""
+        self._thread.join(timeout)
+        return self._result
+
+
+def plan_cache_info():
+    """Return hits, misses, maxsize and current size of the plan cache."""
+    with _plan_cache_lock:
+        return PlanCacheInfo(_plan_cache_stats['hits'], _plan_cache_stats['misses'],
+                             _plan_cache_maxsize, len(_plan_cache))
+
+
+def clear_plan_cache():
+    """Remove all cached plans and reset the hit/miss counters."""
+    with _plan_cache_lock:
+        _plan_cache.clear()
+        _plan_cache_stats['hits'] = 0
+        _plan_cache_stats['misses'] = 0
+
+
+# -------------------------------------------------------------------------------
+# SECTION 6: INCREMENTAL REPLANNING
+# -------------------------------------------------------------------------------
+
+def _bereite_pruefungen_vor(df_exam):
+    """Run the exam preparation of SCHRITT 1 on a copy of df_exam."""
+    df_exam = prepare_exams(df_exam.copy())
+    df_exam['Lernstart'] = df_exam.apply(berechne_lernstart, axis=1)
+    return cleanup_exam_data(df_exam)
+
+
+def _kalender(df_exam, df_plan):
+    """Calendar of a plan before any study time is assigned (SCHRITT 1-2)."""
+    gesamtstunden, gesamttage, df_kalender = berechne_gesamt_lernzeit(df_exam, prepare_plan(df_plan.copy()))
+    df_kalender = erweitere_kalender_mit_pruefungstagen(df_kalender, df_exam, inplace=True)
+    return gesamtstunden, gesamttage, df_kalender
+
+
+def _erster_geaenderter_kalendertag(df_kalender_alt, df_kalender_neu):
+    """First date whose study time or exam differs between two calendars, or None."""
+    spalten = ['Lernzeit (h)', 'Prüfung']
+    alt = df_kalender_alt.set_index('Datum')[spalten]
+    neu = df_kalender_neu.set_index('Datum')[spalten]
+    alt, neu = alt.align(neu, join='outer')
+    verschieden = ((alt['Lernzeit (h)'] != neu['Lernzeit (h)'])
+                   | (alt['Prüfung'].fillna('') != neu['Prüfung'].fillna('')))
+    return verschieden.index[verschieden.to_numpy()].min() if verschieden.any() else None
+
+
+def _erster_betroffener_tag(previous_plan, df_kalender_alt, df_kalender_neu, df_exam_alt, df_exam_neu,
+                            change, settings):
+    """Return the earliest plan date a single exam-date or weekday change can affect."""
+    # Days whose study time or exam entry changed (a changed weekday, a moved exam day)
+    kandidaten = []
+    erster_geaendert = _erster_geaenderter_kalendertag(df_kalender_alt, df_kalender_neu)
+    if erster_geaendert is not None:
+        kandidaten.append(erster_geaendert)
+    
+    if 'Prüfungsdatum' in change:
+        alt = df_exam_alt[df_exam_alt['Fachname'] == change['Fachname']].iloc[0]
+        neu = df_exam_neu[df_exam_neu['Fachname'] == change['Fachname']].iloc[0]
+        
+        # Study window of the subject (only if its start moved), its dedicated days and the day before the exam
+        if alt['Lernstart'] != neu['Lernstart']:
+            kandidaten += [alt['Lernstart'], neu['Lernstart']]
+        vorlauf = pd.Timedelta(days=max(1, settings['dedicated_days_before_exam']))
+        kandidaten += [alt['Prüfungsdatum'] - vorlauf, neu['Prüfungsdatum'] - vorlauf]
+        
+        # Daily reviews stop after the second-to-last exam
+        ende_alt = _letzter_review_termin(df_exam_alt)
+        ende_neu = _letzter_review_termin(df_exam_neu)
+        if ende_alt != ende_neu:
+            kandidaten.append(min(ende_alt, ende_neu) + pd.Timedelta(days=1))
+    
+    if not kandidaten:
+        return pd.to_datetime(previous_plan['Datum']).max() + pd.Timedelta(days=1)
+    return pd.Timestamp(min(kandidaten))
+
+
+def update_plan(previous_plan, change):
+    """
+    Replan an existing study plan after a single change, from the first affected
+    day on.
+    
+    All assignments before that day stay unchanged and count as already scheduled
+    hours; only the rest of the calendar is prepared and allocated again. If the
+    change can already affect the first day of the plan, the plan is regenerated
+    completely.
+    
+    Parameters:
+    -----------
+    previous_plan : pandas DataFrame
+        Study plan from generate_complete_study_plan or update_plan.
+    
+    change : dict
+        The change, either
+        - {'Fachname': ..., 'Prüfungsdatum': ...} for a moved exam date or
+        - {'Tag': ..., 'Lernzeit (h)': ...} for changed study hours on a weekday.
+    
+    Returns:
+    --------
+    pandas DataFrame
+        Updated study plan
+    dict
+        Statistics as from generate_complete_study_plan
+    """
+    plan_inputs = previous_plan.attrs.get('plan_inputs')
+    if plan_inputs is None:
+        raise ValueError("previous_plan has no 'plan_inputs'; create it with generate_complete_study_plan")
+    
+    df_exam_neu = pd.DataFrame(plan_inputs['exams'])
+    df_plan_neu = pd.DataFrame(plan_inputs['plan'])
+    settings = {**DEFAULT_SETTINGS, **plan_inputs['settings']}
+    
+    # Änderung auf die gespeicherten Eingaben anwenden
+    if 'Prüfungsdatum' in change:
+        maske = df_exam_neu['Fachname'] == change.get('Fachname')
+        if not maske.any():
+            raise ValueError(f"Unknown subject: {change.get('Fachname')}")
+        df_exam_neu['Prüfungsdatum'] = pd.to_datetime(df_exam_neu['Prüfungsdatum'])
+        df_exam_neu.loc[maske, 'Prüfungsdatum'] = pd.Timestamp(change['Prüfungsdatum'])
+    elif 'Tag' in change and 'Lernzeit (h)' in change:
+        maske = df_plan_neu['Tag'] == change['Tag']
+        if not maske.any():
+            raise ValueError(f"Unknown weekday: {change['Tag']}")
+        df_plan_neu.loc[maske, 'Lernzeit (h)'] = change['Lernzeit (h)']
+    else:
+        raise ValueError("change must contain 'Fachname' and 'Prüfungsdatum', or 'Tag' and 'Lernzeit (h)'")
+    
+    df_exam_alt = _bereite_pruefungen_vor(pd.DataFrame(plan_inputs['exams']))
+    df_exam = _bereite_pruefungen_vor(df_exam_neu)
+    
+    # Kalender und Zielstunden hängen vom gesamten Zeitraum ab und werden neu berechnet
+    gesamtstunden, gesamttage, df_kalender = _kalender(df_exam, df_plan_neu)
+    df_exam = berechne_zielstunden(df_exam, df_kalender, inplace=True)
+    _, _, df_kalender_alt = _kalender(df_exam_alt, pd.DataFrame(plan_inputs['plan']))
+    stichtag = _erster_betroffener_tag(previous_plan, df_kalender_alt, df_kalender, df_exam_alt, df_exam,
+                                       change, settings)
+    
+    erster_tag = pd.to_datetime(previous_plan['Datum']).min()
+    df_rest = df_kalender[df_kalender['Datum'] >= stichtag]
+    if df_rest.empty and len(df_kalender) == len(previous_plan):
+        # Nichts betroffen (z. B. gleiche Lernzeit wie bisher): bisherigen Plan behalten
+        df_lernplan = previous_plan.copy()
+        df_lernplan.attrs['plan_inputs'] = _plan_inputs(df_exam_neu, df_plan_neu, settings)
+        return df_lernplan, _sammle_statistiken(df_lernplan, gesamtstunden, gesamttage, df_exam)
+    if stichtag <= erster_tag or df_kalender['Datum'].min() < erster_tag or df_rest.empty:
+        return generate_complete_study_plan(df_exam_neu, df_plan_neu, settings)
+    
+    # Tage vor dem Stichtag unverändert übernehmen
+    df_vorher = previous_plan[(previous_plan['Datum'] < stichtag)
+                              & (previous_plan['Datum'] >= df_kalender['Datum'].min())]
+    
+    # SCHRITT 3-5 nur für die Tage ab dem Stichtag
+    df_rest = aktualisiere_freie_zeit(erstelle_fächer(df_rest), inplace=True)
+    df_rest = aktualisiere_freie_zeit(fülle_vortage_aller_prüfungen(df_rest, inplace=True), inplace=True)
+    df_rest = plane_daily_reviews(df_rest, df_exam, wiederhol_dauer=settings['wiederhol_dauer'], inplace=True)
+    df_rest = aktualisiere_freie_zeit(df_rest, inplace=True)
+    
+    # SCHRITT 6-7: Übernommene Stunden zählen als bereits verplant
+    df_bereits_verplante_stunden = get_total_study_time_by_subject(pd.concat([df_vorher, df_rest]))
+    df_rest = fill_study_plan(df_exam, df_rest, df_bereits_verplante_stunden, inplace=True,
+                              **_fill_settings(settings))
+    
+    df_lernplan = pd.concat([df_vorher, df_rest], ignore_index=True)
+    df_lernplan.attrs['completion_stats'] = df_rest.attrs.get('completion_stats', {})
+    df_lernplan.attrs['fairness_metrics'] = df_rest.attrs.get('fairness_metrics', {})
+    df_lernplan.attrs['diversity_metrics'] = _diversity_metrics(df_lernplan, settings['max_consecutive_days'])
+    
+    gesamt_stats = _sammle_statistiken(df_lernplan, gesamtstunden, gesamttage, df_exam)
+    df_lernplan.attrs['plan_inputs'] = _plan_inputs(df_exam_neu, df_plan_neu, settings)
+    return df_lernplan, gesamt_stats
+
+
+# -------------------------------------------------------------------------------
+# SECTION 7: CALENDAR EXPORT (ICS)
+# -------------------------------------------------------------------------------
+
+_ICS_HEADER = [
+    "BEGIN:VCALENDAR",
+    "VERSION:2.0",
+    "PRODID:-//Lernplan Generator//DE",
+    "CALSCALE:GREGORIAN",
+    "METHOD:PUBLISH"
+]
+_ICS_FOOTER = ["END:VCALENDAR"]
+
+# All calendar entries start at 8:00; exams are entered with a fixed duration
+_ICS_START_HOUR = 8
+_ICS_EXAM_HOURS = 2.0
+
+
+def _hat_eintrag(value):
+    """Check whether a plan cell holds a real entry (not empty, NaN or 'None')."""
+    return pd.notna(value) and value != "" and value != "None"
+
+
+def _ics_event(summary, tag, stunden, description):
+    """Yield the lines of one iCalendar event."""
+    start_time = tag.replace(hour=_ICS_START_HOUR, minute=0, second=0, microsecond=0)
+    end_time = start_time + timedelta(hours=float(stunden))
+    yield "BEGIN:VEVENT"
+    yield f"SUMMARY:{summary}"
+    yield f"DTSTART:{start_time.strftime('%Y%m%dT%H%M%S')}"
+    yield f"DTEND:{end_time.strftime('%Y%m%dT%H%M%S')}"
+    yield f"DESCRIPTION:{description}"
+    yield f"UID:{uuid.uuid4()}"
+    yield "END:VEVENT"
+
+
+def iter_ics_lines(df_lernplan):
+    """
+    Yield the lines of an iCalendar file straight from a study plan.
+    
+    Reads the columns Datum, Prüfung, Lernfach n/Dauer n and Daily Review/Dauer 4
+    as returned by generate_complete_study_plan. The lines are produced one at a
+    time, so the file never has to be held in memory as a whole.
+    """
+    yield from _ICS_HEADER
+    
+    anzahl = len(df_lernplan)
+    datum = pd.to_datetime(df_lernplan['Datum']).tolist()
+    pruefungen = df_lernplan['Prüfung'].tolist() if 'Prüfung' in df_lernplan.columns else [None] * anzahl
+    
+    # Lerneinheiten und bereits aufgeteilte Daily Reviews, sortiert nach Zeile und Slot
+    positionen, slots, faecher, stunden = (werte.tolist() for werte in _sitzungen(df_lernplan))
+    naechste = 0
+    
+    for pos in range(anzahl):
+        tag = datum[pos]
+        
+        # Lerneinheiten dieses Tages
+        ende = naechste
+        while ende < len(positionen) and positionen[ende] == pos:
+            ende += 1
+        heute = range(naechste, ende)
+        naechste = ende
+        
+        if pd.isna(tag):
+            continue
+        
+        # Prüfungstermine
+        if _hat_eintrag(pruefungen[pos]):
+            yield from _ics_event(f"PRÜFUNG: {pruefungen[pos]}", tag, _ICS_EXAM_HOURS, "Prüfungstermin")
+        
+        # Lernfächer mit ihrer geplanten Dauer, danach Daily Review je Fach
+        for k in heute:
+            if slots[k] == _REVIEW_SLOT:
+                yield from _ics_event(f"Daily Review: {faecher[k]}", tag, stunden[k],
+                                      f"Wiederholung: {stunden[k]} Stunden")
+            else:
+                yield from _ics_event(f"Lernen: {faecher[k]}", tag, stunden[k], f"{stunden[k]} Stunden")
+    
+    yield from _ICS_FOOTER
+
+
+def write_ics_file(df_lernplan, fileobj, newline="\n"):
+    """
+    Write a study plan as an iCalendar file to a file-like object
+    (e.g. an open text file or io.StringIO).
+    
+    Returns:
+    --------
+    int
+        Number of calendar events written
+    """
+    anzahl_events = 0
+    for line in iter_ics_lines(df_lernplan):
+        if line == "BEGIN:VEVENT":
+            anzahl_events += 1
+        fileobj.write(line + newline)
+    return anzahl_events
+
+
+# -------------------------------------------------------------------------------
+# SECTION 8: SESSIONS TABLE
+# -------------------------------------------------------------------------------
+
+# Kinds of study sessions; slots 1-3 are 'Lernen', slot 4 is the daily review
+SESSION_KINDS = ['Lernen', 'Daily Review']
+_REVIEW_SLOT = 4
+
+
+def _sitzungen(df_lernplan, mit_leeren=False):
+    """
+    Collect the sessions of a wide plan as flat arrays, ordered by plan row and slot.
+    
+    Returns (row position, slot, subject, hours); daily reviews are split into one
+    session per subject with the review time divided evenly. Entries with a subject
+    but no hours are skipped unless mit_leeren is set.
+    """
+    positionen, slots, faecher, stunden = [], [], [], []
+    
+    for i in range(1, 4):
+        if f'Lernfach {i}' not in df_lernplan.columns or f'Dauer {i}' not in df_lernplan.columns:
+            continue
+        fach = df_lernplan[f'Lernfach {i}'].to_numpy(dtype=object)
+        dauer = pd.to_numeric(df_lernplan[f'Dauer {i}'], errors='coerce').to_numpy(dtype=float)
+        maske = pd.notna(fach) & (fach != '') & (fach != 'None') & ((dauer > 0) | mit_leeren)
+        pos = np.flatnonzero(maske)
+        positionen.append(pos)
+        slots.append(np.full(len(pos), i, dtype=np.int8))
+        faecher.append(fach[pos])
+        stunden.append(dauer[pos])
+    
+    if 'Daily Review' in df_lernplan.columns and 'Dauer 4' in df_lernplan.columns:
+        reviews = pd.Series(df_lernplan['Daily Review'].to_numpy(dtype=object))
+        dauer = pd.to_numeric(df_lernplan['Dauer 4'], errors='coerce').to_numpy(dtype=float)
+        maske = reviews.notna().to_numpy() & ((dauer > 0) | mit_leeren)
+        # Split the comma-joined review strings once, one entry per subject
+        einzeln = reviews[maske].astype(str).str.split(',').explode().str.strip()
+        einzeln = einzeln[(einzeln != '') & (einzeln != 'None')]
+        pos = einzeln.index.to_numpy()
+        anzahl = einzeln.groupby(level=0).transform('size').to_numpy()
+        positionen.append(pos)
+        slots.append(np.full(len(pos), _REVIEW_SLOT, dtype=np.int8))
+        faecher.append(einzeln.to_numpy(dtype=object))
+        stunden.append(dauer[pos] / anzahl if len(pos) else dauer[pos])
+    
+    if not positionen:
+        return (np.array([], dtype=np.int64), np.array([], dtype=np.int8),
+                np.array([], dtype=object), np.array([], dtype=float))
+    
+    positionen = np.concatenate(positionen).astype(np.int64)
+    slots = np.concatenate(slots)
+    reihenfolge = np.lexsort((slots, positionen))
+    return (positionen[reihenfolge], slots[reihenfolge],
+            np.concatenate(faecher)[reihenfolge], np.concatenate(stunden)[reihenfolge])
+
+
+def plan_sessions(df_lernplan, subjects=None):
+    """
+    Convert a study plan in wide format into a long sessions table.
+    
+    One row per study session with the columns Datum, Fach (categorical), Art
+    ('Lernen' or 'Daily Review'), Slot (1-3, 4 for the daily review) and Stunden.
+    Daily reviews are split into their subjects once, with the time shared equally.
+    Entries with a subject but no hours (e.g. reserved days of a subject whose target
+    is already reached) are kept with 0 hours, so that sessions_to_plan restores the
+    plan unchanged.
+    
+    subjects : list, optional
+        Fixed order of the subject categories, e.g. df_exam['Fachname'], so that the
+        codes stay the same across plans (default: alphabetical).
+    """
+    positionen, slots, faecher, stunden = _sitzungen(df_lernplan, mit_leeren=True)
+    
+    gefunden = sorted(set(faecher))
+    if subjects is None:
+        kategorien = gefunden
+    else:
+        kategorien = list(dict.fromkeys(subjects))
+        kategorien += [fach for fach in gefunden if fach not in set(kategorien)]
+    
+    datum = pd.to_datetime(df_lernplan['Datum']).to_numpy(dtype='datetime64[ns]')
+    return pd.DataFrame({
+        'Datum': datum[positionen],
+        'Fach': pd.Categorical(faecher, categories=kategorien),
+        'Art': pd.Categorical.from_codes((slots == _REVIEW_SLOT).astype(np.int8), categories=SESSION_KINDS),
+        'Slot': slots,
+        'Stunden': stunden,
+    })
+
+
+def sessions_to_plan(df_sessions, df_kalender):
+    """
+    Rebuild the wide view for the UI from a sessions table (plan_sessions).
+    
+    df_kalender provides the day rows (at least Datum, each date once); its columns
+    Lernfach 1-3, Dauer 1-3, Daily Review and Dauer 4 are set from the sessions, all
+    other columns stay unchanged. Sessions on a date that is not in df_kalender raise
+    a ValueError.
+    """
+    df_plan = df_kalender.copy()
+    anzahl = len(df_plan)
+    
+    # Plan row of every session; a date missing from the calendar must not land on a neighbour
+    tage = pd.to_datetime(df_plan['Datum']).to_numpy(dtype='datetime64[ns]')
+    ordnung = np.argsort(tage, kind='stable')
+    sortiert = tage[ordnung]
+    sitzungstage = pd.to_datetime(df_sessions['Datum']).to_numpy(dtype='datetime64[ns]')
+    idx = np.minimum(np.searchsorted(sortiert, sitzungstage), max(anzahl - 1, 0))
+    unbekannt = np.ones(len(sitzungstage), dtype=bool) if anzahl == 0 else sortiert[idx] != sitzungstage
+    if unbekannt.any():
+        tage_text = ', '.join(sorted({str(tag)[:10] for tag in sitzungstage[unbekannt]}))
+        raise ValueError(f"Session dates not in the calendar: {tage_text}")
+    pos = ordnung[idx]
+    
+    slots = df_sessions['Slot'].to_numpy()
+    faecher = df_sessions['Fach'].astype(object).to_numpy()
+    stunden = df_sessions['Stunden'].to_numpy(dtype=float)
+    
+    for i in range(1, 4):
+        maske = slots == i
+        fach = np.full(anzahl, None, dtype=object)
+        dauer = np.zeros(anzahl)
+        fach[pos[maske]] = faecher[maske]
+        dauer[pos[maske]] = stunden[maske]
+        df_plan[f'Lernfach {i}'] = pd.Series(fach, index=df_plan.index, dtype=object)
+        df_plan[f'Dauer {i}'] = dauer
+    
+    # Daily reviews: join the subjects of each day again and add up their time
+    maske = slots == _REVIEW_SLOT
+    reviews = np.full(anzahl, '', dtype=object)
+    dauer = np.zeros(anzahl)
+    if maske.any():
+        je_tag = pd.DataFrame({'pos': pos[maske], 'Fach': faecher[maske], 'Stunden': stunden[maske]})
+        gruppen = je_tag.groupby('pos', sort=False)
+        verbunden = gruppen['Fach'].agg(', '.join)
+        reviews[verbunden.index.to_numpy()] = verbunden.to_numpy()
+        summen = gruppen['Stunden'].sum()
+        dauer[summen.index.to_numpy()] = summen.to_numpy()
+    df_plan['Daily Review'] = reviews
+    df_plan['Dauer 4'] = dauer
+    
+    return df_plan
+
+
+# -------------------------------------------------------------------------------
+# SECTION 9: SETTINGS TUNING
+# -------------------------------------------------------------------------------
+
+# Scheduler weights that tune_settings searches by default
+DEFAULT_SEARCH_SPACE = {
+    'exam_proximity_weight': [1.5, 2.0, 3.0, 4.0],
+    'fairness_weight': [1.0, 2.5, 4.0],
+    'min_days_between': [1, 2, 3],
+    'max_consecutive_days': [1, 2, 3],
+    'dedicated_days_before_exam': [1, 2, 3],
+}
+
+TuningResult = namedtuple("TuningResult", ["settings", "plan", "stats", "trials"])
+
+# Shared precomputation of the tuning workers, set once per process by _init_tuning_worker
+_tuning_shared = None
+
+
+def plan_quality_score(gesamt_stats):
+    """Default tuning score, lower is better: spread of the completion percentages plus subject streaks."""
+    fairness = gesamt_stats['Fairness-Metriken']
+    diversity = gesamt_stats['Diversitäts-Metriken']
+    return (float(fairness['std_deviation'])
+            + diversity['long_sequences_count']
+            + diversity['avg_consecutive_days'])
+
+
+def _prepare_tuning(df_exam, df_plan):
+    """Run the settings-independent SCHRITT 1-4 once for all candidates of a tuning run."""
+    return _prepare_stages(_bereite_pruefungen_vor(df_exam), df_plan)
+
+
+def _prepare_stages(df_exam, df_plan):
+    """Run SCHRITT 2-4 on exams already prepared by _bereite_pruefungen_vor (df_exam is extended in place)."""
+    df_plan = prepare_plan(df_plan.copy())
+    
+    gesamtstunden, gesamttage, df_kalender = berechne_gesamt_lernzeit(df_exam, df_plan)
+    df_kalender = erweitere_kalender_mit_pruefungstagen(df_kalender, df_exam, inplace=True)
+    df_exam = berechne_zielstunden(df_exam, df_kalender, inplace=True)
+    
+    df_lernplan = aktualisiere_freie_zeit(erstelle_fächer(df_kalender, inplace=True), inplace=True)
+    df_lernplan = aktualisiere_freie_zeit(fülle_vortage_aller_prüfungen(df_lernplan, inplace=True), inplace=True)
+    return {
+        'exam': df_exam,
+        'lernplan': df_lernplan,
+        'gesamtstunden': gesamtstunden,
+        'gesamttage': gesamttage,
+    }
+
+
+def _plan_from_prepared(shared, settings):
+    """Run SCHRITT 5-8 for one settings candidate on top of _prepare_tuning."""
+    df_exam = shared['exam']
+    df_lernplan = plane_daily_reviews(shared['lernplan'].copy(), df_exam, wiederhol_dauer=settings['wiederhol_dauer'],
+                                      inplace=True)
+    df_lernplan = aktualisiere_freie_zeit(df_lernplan, inplace=True)
+    df_bereits_verplante_stunden = get_total_study_time_by_subject(df_lernplan)
+    df_lernplan = fill_study_plan(df_exam, df_lernplan, df_bereits_verplante_stunden, inplace=True,
+                                  **_fill_settings(settings))
+    gesamt_stats = _sammle_statistiken(df_lernplan, shared['gesamtstunden'], shared['gesamttage'], df_exam)
+    return df_lernplan, gesamt_stats
+
+
+def _init_tuning_worker(shared):
+    global _tuning_shared
+    _tuning_shared = shared
+
+
+def _evaluate_settings(settings):
+    """Evaluate one candidate in a tuning worker; returns (stats, error) without the plan itself."""
+    try:
+        return _plan_from_prepared(_tuning_shared, settings)[1], None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def _tuning_candidates(search_space, method, n_iter, seed):
+    """Yield the settings overrides of a grid or random search."""
+    namen = list(search_space)
+    if method == 'grid':
+        for werte in itertools.product(*(search_space[name] for name in namen)):
+            yield dict(zip(namen, werte))
+    elif method == 'random':
+        rng = np.random.default_rng(seed)
+        for _ in range(n_iter):
+            yield {name: search_space[name][rng.integers(len(search_space[name]))] for name in namen}
+    else:
+        raise ValueError(f"Unknown search method: {method!r} (expected 'grid' or 'random')")
+
+
+def tune_settings(df_exam, df_plan, base_settings=None, search_space=None, method='grid', n_iter=50,
+                  time_budget=None, workers=None, score=None, seed=0):
+    """
+    Search for the settings that give the best-scored study plan.
+    
+    The calendar, target hours and exam-eve planning (SCHRITT 1-4) do not depend on
+    the weights; they are computed once and handed to each worker process once. Only
+    SCHRITT 5-8 run per candidate.
+    
+    Parameters:
+    -----------
+    df_exam, df_plan : pandas DataFrame
+        Inputs as for generate_complete_study_plan (not modified).
+    
+    base_settings : dict, optional
+        Fixed settings that each candidate overrides (default: DEFAULT_SETTINGS).
+    
+    search_space : dict, optional
+        Setting -> list of possible values (default: DEFAULT_SEARCH_SPACE).
+    
+    method : str, optional
+        'grid' for all combinations or 'random' for n_iter random ones (default: 'grid').
+    
+    time_budget : float, optional
+        Time budget in seconds. After it no further candidates are started, and the best
+        one scored so far wins (default: no limit). Candidates still running when the
+        budget runs out are not waited for; they finish in the background and their
+        results are discarded. The budget is therefore only exceeded by the time to
+        rebuild the winner's plan once and, if no candidate has finished by then, until
+        the first result arrives: at least one candidate is always scored. Without a pool
+        (workers=1) the candidate that is running can also exceed the budget by its own
+        run time.
+    
+    workers : int, optional
+        Number of worker processes (default: number of CPU cores). With 1 no pool is used.
+    
+    score : callable, optional
+        Scores the statistics of a plan, lower is better (default: plan_quality_score).
+    
+    Returns:
+    --------
+    TuningResult
+        settings (the best complete settings), plan and stats (its study plan, as from
+        generate_complete_study_plan) and trials (DataFrame with all scored candidates,
+        their score and error message).
+    """
+    start = time.perf_counter()
+    deadline = None if time_budget is None else start + time_budget
+    score = score or plan_quality_score
+    
+    basis = dict(DEFAULT_SETTINGS)
+    basis.update(base_settings or {})
+    kandidaten = [{**basis, **override}
+                  for override in _tuning_candidates(search_space or DEFAULT_SEARCH_SPACE, method, n_iter, seed)]
+    if not kandidaten:
+        raise ValueError("The search space has no candidates")
+    
+    plan_inputs = _plan_inputs(df_exam, df_plan, basis)
+    shared = _prepare_tuning(df_exam, df_plan)
+    
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(kandidaten)))
+    
+    ergebnisse = []
+    if workers == 1:
+        _init_tuning_worker(shared)
+        for settings in kandidaten:
+            if deadline is not None and ergebnisse and time.perf_counter() >= deadline:
+                break
+            ergebnisse.append((settings, *_evaluate_settings(settings)))
+    else:
+        from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+        
+        # Keep a few candidates per worker in flight, so stopping at the deadline wastes little work
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_tuning_worker,
+                                 initargs=(shared,)) as pool:
+            offen = {}
+            naechster = 0
+            while naechster < len(kandidaten) or offen:
+                abgelaufen = deadline is not None and time.perf_counter() >= deadline
+                if abgelaufen and ergebnisse:
+                    # Leaving the with block would wait for the running candidates; drop them instead
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    break
+                while not abgelaufen and naechster < len(kandidaten) and len(offen) < 2 * workers:
+                    offen[pool.submit(_evaluate_settings, kandidaten[naechster])] = kandidaten[naechster]
+                    naechster += 1
+                if not offen:
+                    break
+                # Past the deadline without any result, wait for the first one: there is nothing to return yet
+                timeout = None if deadline is None or abgelaufen else max(0, deadline - time.perf_counter())
+                fertig, _ = wait(offen, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in fertig:
+                    ergebnisse.append((offen.pop(future), *future.result()))
+    
+    trials = []
+    for settings, gesamt_stats, fehler in ergebnisse:
+        zeile = {name: settings[name] for name in (search_space or DEFAULT_SEARCH_SPACE)}
+        zeile['Score'] = score(gesamt_stats) if gesamt_stats is not None else np.nan
+        zeile['Fehler'] = fehler
+        trials.append(zeile)
+    trials = pd.DataFrame(trials)
+    
+    gueltig = trials['Score'].notna()
+    if not gueltig.any():
+        raise ValueError(f"No settings candidate could be planned: {trials['Fehler'].iloc[0]}")
+    best_settings = ergebnisse[int(trials.loc[gueltig, 'Score'].idxmin())][0]
+    
+    # The workers only return statistics; the winning plan is rebuilt once here
+    df_lernplan, gesamt_stats = _plan_from_prepared(shared, best_settings)
+    df_lernplan.attrs['plan_inputs'] = {**plan_inputs, 'settings': dict(best_settings)}
+    
+    trials = trials.sort_values('Score', kind='stable').reset_index(drop=True)
+    return TuningResult(best_settings, df_lernplan, gesamt_stats, trials)
+
+
+# -------------------------------------------------------------------------------
+# SECTION 10: PLAN VIEWS
+# -------------------------------------------------------------------------------
+
+# Colors of the FullCalendar events that do not depend on the subject
+_EVENT_EXAM_COLOR = "#d62728"
+_EVENT_EXAM_BORDER = "#b01e1e"
+_EVENT_SUBJECT_BORDER = "#686868"
+_EVENT_DEFAULT_COLOR = "#7f7f7f"
+_EVENT_REVIEW_COLOR = "#E0E0E0"
+_EVENT_REVIEW_BORDER = "#a0a0a0"
+
+# Columns of a plan that the views read
+_PLAN_VIEW_COLUMNS = ['Datum', 'Prüfung', 'Lernfach 1', 'Dauer 1', 'Lernfach 2', 'Dauer 2',
+                      'Lernfach 3', 'Dauer 3', 'Daily Review', 'Dauer 4']
+
+CalendarEventIndex = namedtuple("CalendarEventIndex", ["events", "months"])
+DashboardStats = namedtuple("DashboardStats", ["total_hours", "hours_per_subject", "exam_count", "exams"])
+
+# Derived views (calendar events, dashboard statistics) of recently shown plans
+_view_cache = OrderedDict()
+_view_cache_lock = threading.Lock()
+_view_cache_maxsize = 32
+
+
+def _view_cache_get(key):
+    with _view_cache_lock:
+        wert = _view_cache.get(key)
+        if wert is not None:
+            _view_cache.move_to_end(key)
+        return wert
+
+
+def _view_cache_put(key, wert):
+    with _view_cache_lock:
+        _view_cache[key] = wert
+        while len(_view_cache) > _view_cache_maxsize:
+            _view_cache.popitem(last=False)
+
+
+def plan_content_fingerprint(df_lernplan):
+    """Stable hash over the columns of a finished plan that the views read."""
+    spalten = [col for col in _PLAN_VIEW_COLUMNS if col in df_lernplan.columns]
+    werte = pd.util.hash_pandas_object(df_lernplan[spalten], index=False).to_numpy()
+    digest = hashlib.sha256(json.dumps(spalten, ensure_ascii=False).encode('utf-8'))
+    digest.update(werte.tobytes())
+    return digest.hexdigest()
+
+
+def _view_plan_key(df_lernplan, plan_key):
+    """Cache key of a plan for the views: the caller's key, else a hash of the plan."""
+    return ('key', plan_key) if plan_key is not None else ('content', plan_content_fingerprint(df_lernplan))
+
+
+def _gesetzt(werte):
+    """Mask of the cells that are neither missing nor the string 'None'."""
+    return pd.notna(werte) & (werte != 'None')
+
+
+def _build_calendar_events(df_lernplan, color_mapping):
+    anzahl = len(df_lernplan)
+    tage = pd.to_datetime(df_lernplan['Datum']).dt.strftime('%Y-%m-%d').tolist()
+    teile = []
+    
+    # Exams, then study slots 1-3, then the daily review of each day
+    if 'Prüfung' in df_lernplan.columns:
+        pruefungen = df_lernplan['Prüfung'].to_numpy(dtype=object)
+        for pos in np.flatnonzero(_gesetzt(pruefungen)):
+            fach = pruefungen[pos]
+            teile.append((pos, 0, {
+                "id": f"exam-{tage[pos]}",
+                "title": f"{fach}",
+                "start": tage[pos],
+                "backgroundColor": _EVENT_EXAM_COLOR,
+                "borderColor": _EVENT_EXAM_BORDER,
+                "textColor": "white",
+                "description": f"Prüfung in {fach}",
+                "display": "block",
+                "allDay": True
+            }))
+    
+    for i in range(1, 4):
+        if f'Lernfach {i}' not in df_lernplan.columns or f'Dauer {i}' not in df_lernplan.columns:
+            continue
+        faecher = df_lernplan[f'Lernfach {i}'].to_numpy(dtype=object)
+        dauern = pd.to_numeric(df_lernplan[f'Dauer {i}'], errors='coerce').to_numpy(dtype=float)
+        for pos in np.flatnonzero(_gesetzt(faecher) & (dauern > 0)):
+            fach, dauer = faecher[pos], float(dauern[pos])
+            teile.append((pos, i, {
+                "id": f"s{i}-{tage[pos]}",
+                "title": f"{fach} ({dauer}h)",
+                "start": tage[pos],
+                "backgroundColor": color_mapping.get(fach, _EVENT_DEFAULT_COLOR),
+                "borderColor": _EVENT_SUBJECT_BORDER,
+                "textColor": "white",
+                "description": f"Lernzeit für {fach}: {dauer} Stunden",
+                "display": "block"
+            }))
+    
+    if 'Daily Review' in df_lernplan.columns:
+        reviews = df_lernplan['Daily Review'].to_numpy(dtype=object)
+        if 'Dauer 4' in df_lernplan.columns:
+            dauern = pd.to_numeric(df_lernplan['Dauer 4'], errors='coerce').to_numpy(dtype=float)
+        else:
+            dauern = np.full(anzahl, 0.25)
+        for pos in np.flatnonzero(_gesetzt(reviews) & (dauern > 0)):
+            review, dauer = reviews[pos], float(dauern[pos])
+            teile.append((pos, 4, {
+                "id": f"review-{tage[pos]}",
+                "title": f"Daily: {review} ({dauer}h)",
+                "start": tage[pos],
+                "backgroundColor": _EVENT_REVIEW_COLOR,
+                "borderColor": _EVENT_REVIEW_BORDER,
+                "textColor": "black",
+                "description": f"Tägliche Wiederholung: {review} ({dauer}h)",
+                "display": "block"
+            }))
+    
+    teile.sort(key=lambda teil: (teil[0], teil[1]))
+    return [event for _, _, event in teile]
+
+
+def calendar_event_index(df_lernplan, color_mapping, plan_key=None):
+    """
+    Build the events of a study plan for the FullCalendar component (streamlit_calendar)
+    and index them by month.
+    
+    Each day gets one event per exam, one per study slot with hours and one for the
+    daily review. The IDs are deterministic ('exam-2025-06-15', 's1-2025-06-15', 'review-...').
+    
+    Returns a CalendarEventIndex with events (all events in plan order) and months
+    ({'2025-06': [...], ...}). The result is cached by plan_key and color_mapping;
+    the returned lists are shared and must not be modified.
+    
+    plan_key : str, optional
+        Key that identifies the plan, e.g. its plan_fingerprint. Without it,
+        plan_content_fingerprint is computed over the plan on every call.
+    """
+    key = ('events', _view_plan_key(df_lernplan, plan_key), tuple(sorted(color_mapping.items())))
+    index = _view_cache_get(key)
+    if index is not None:
+        return index
+    
+    events = _build_calendar_events(df_lernplan, color_mapping)
+    months = defaultdict(list)
+    for event in events:
+        months[event["start"][:7]].append(event)
+    index = CalendarEventIndex(events, dict(sorted(months.items())))
+    _view_cache_put(key, index)
+    return index
+
+
+def build_calendar_events(df_lernplan, color_mapping, plan_key=None):
+    """All calendar events of a study plan, see calendar_event_index."""
+    return calendar_event_index(df_lernplan, color_mapping, plan_key).events
+
+
+def _monate(start, end):
+    """'YYYY-MM' keys of all months from the month of start up to the month of end."""
+    jahr, monat = start.year, start.month
+    while (jahr, monat) <= (end.year, end.month):
+        yield f"{jahr:04d}-{monat:02d}"
+        jahr, monat = (jahr + 1, 1) if monat == 12 else (jahr, monat + 1)
+
+
+def calendar_events_window(df_lernplan, color_mapping, start, end, buffer_days=7, plan_key=None):
+    """
+    Calendar events of a study plan in the period [start, end), plus buffer_days days
+    on both sides.
+    
+    Meant for the visible window of the calendar view: instead of all events of the
+    plan, the component only gets those of the months shown. The events are read via
+    the month index of calendar_event_index (plan_key as there).
+    """
+    start = pd.Timestamp(start).normalize() - timedelta(days=buffer_days)
+    end = pd.Timestamp(end).normalize() + timedelta(days=buffer_days)
+    von, bis = start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')
+    
+    months = calendar_event_index(df_lernplan, color_mapping, plan_key).months
+    events = []
+    for monat in _monate(start, end):
+        events.extend(event for event in months.get(monat, ()) if von <= event["start"] < bis)
+    return events
+
+
+def dashboard_statistics(df_lernplan, today=None, plan_key=None):
+    """
+    Compute all figures of the statistics section of the Lernplan page in one pass.
+    
+    today : date, optional
+        Reference date for the remaining days (default: today in Europe/Berlin).
+    
+    Returns a DashboardStats with
+        total_hours       - sum of all study sessions including the daily review (h)
+        hours_per_subject - {subject: hours} alphabetically, only subjects with hours > 0;
+                            daily reviews are split equally across their subjects
+        exam_count        - number of exam days (None without a 'Prüfung' column)
+        exams             - upcoming exams as [{'subject', 'date', 'days_remaining'}],
+                            sorted by remaining days
+    
+    The result is cached by plan_key (see calendar_event_index) and reference date and
+    must not be modified.
+    """
+    if today is None:
+        today = pd.Timestamp.now(tz='Europe/Berlin').date()
+    key = ('dashboard', _view_plan_key(df_lernplan, plan_key), today)
+    stats = _view_cache_get(key)
+    if stats is not None:
+        return stats
+    
+    # Hours: one aggregation over the flat sessions (slots 1-3 and split reviews)
+    _, _, faecher, stunden = _sitzungen(df_lernplan)
+    codes, kategorien = pd.factorize(faecher, sort=True)
+    summen = np.bincount(codes, weights=stunden, minlength=len(kategorien)) if len(codes) else np.zeros(0)
+    hours_per_subject = {fach: float(summe) for fach, summe in zip(kategorien, summen) if summe > 0}
+    
+    exam_count, exams = None, []
+    if 'Prüfung' in df_lernplan.columns:
+        pruefungen = df_lernplan['Prüfung'].to_numpy(dtype=object)
+        pos = np.flatnonzero(_gesetzt(pruefungen))
+        exam_count = len(pos)
+        tage = pd.to_datetime(df_lernplan['Datum']).to_numpy(dtype='datetime64[D]')[pos]
+        verbleibend = (tage - np.datetime64(today, 'D')).astype(np.int64)
+        zukunft = np.flatnonzero(verbleibend >= 0)
+        zukunft = zukunft[np.argsort(verbleibend[zukunft], kind='stable')]
+        exams = [{'subject': pruefungen[pos[k]],
+                  'date': tage[k].astype(object),
+                  'days_remaining': int(verbleibend[k])} for k in zukunft]
+    
+    stats = DashboardStats(float(stunden.sum()), hours_per_subject, exam_count, exams)
+    _view_cache_put(key, stats)
+    return stats
+
+
+def clear_view_cache():
+    """Clear the cache of calendar events and dashboard statistics."""
+    with _view_cache_lock:
+        _view_cache.clear()
+
+
+# -------------------------------------------------------------------------------
+# SECTION 11: SCENARIOS
+# -------------------------------------------------------------------------------
+
+ScenarioResult = namedtuple("ScenarioResult", ["summary", "subjects", "plans"])
+
+# Keys a scenario may contain besides 'name'
+SCENARIO_KEYS = ('settings', 'Lernzeit (h)', 'Zusätzliche Lernzeit (h)', 'Prüfungsdatum', 'Start',
+                 'Lernstart früher (Tage)')
+
+
+def _apply_scenario(df_exam, df_plan, scenario):
+    """Apply the input deltas of one scenario to copies of the raw exams and weekly plan."""
+    unbekannt = set(scenario) - set(SCENARIO_KEYS) - {'name'}
+    if unbekannt:
+        raise ValueError(f"Unknown scenario keys: {', '.join(sorted(unbekannt))}")
+    df_exam, df_plan = df_exam.copy(), df_plan.copy()
+    
+    def zeilen(df, spalte, wert):
+        maske = df[spalte] == wert
+        if not maske.any():
+            raise ValueError(f"Unknown {'subject' if spalte == 'Fachname' else 'weekday'}: {wert}")
+        return maske
+    
+    for fach, datum in scenario.get('Prüfungsdatum', {}).items():
+        df_exam['Prüfungsdatum'] = pd.to_datetime(df_exam['Prüfungsdatum'])
+        df_exam.loc[zeilen(df_exam, 'Fachname', fach), 'Prüfungsdatum'] = pd.Timestamp(datum)
+    start = scenario.get('Start', {})
+    if isinstance(start, str):
+        df_exam['Start'] = start
+    else:
+        for fach, wert in start.items():
+            df_exam.loc[zeilen(df_exam, 'Fachname', fach), 'Start'] = wert
+    
+    df_plan['Lernzeit (h)'] = df_plan['Lernzeit (h)'].astype(float)
+    for tag, stunden in scenario.get('Lernzeit (h)', {}).items():
+        df_plan.loc[zeilen(df_plan, 'Tag', tag), 'Lernzeit (h)'] = float(stunden)
+    for tag, stunden in scenario.get('Zusätzliche Lernzeit (h)', {}).items():
+        maske = zeilen(df_plan, 'Tag', tag)
+        df_plan.loc[maske, 'Lernzeit (h)'] = (df_plan.loc[maske, 'Lernzeit (h)'] + stunden).clip(lower=0)
+    return df_exam, df_plan
+
+
+def _scenario_key(*teile):
+    return json.dumps(teile, sort_keys=True, default=str, ensure_ascii=False)
+
+
+def _evaluate_scenario(shared, settings):
+    """Run SCHRITT 5-8 of one scenario; returns (plan, stats, error)."""
+    try:
+        return (*_plan_from_prepared(shared, settings), None)
+    except Exception as e:
+        return None, None, f"{type(e).__name__}: {e}"
+
+
+def compare_scenarios(df_exam, df_plan, scenarios, settings=None, workers=None):
+    """
+    Compare what-if variants of a study plan, e.g. "one more hour on Saturday" or
+    "start two weeks earlier".
+    
+    Shared stages are computed only once: the exam preparation (SCHRITT 1) once per
+    exam variant, and the calendar, exam days, target hours and exam eves (SCHRITT 2-4)
+    once per combination of exams and weekly plan. Only SCHRITT 5-8 run per scenario,
+    in parallel in worker processes.
+    
+    Parameters:
+    -----------
+    df_exam, df_plan : pandas DataFrame
+        Base inputs as for generate_complete_study_plan (not modified).
+    
+    scenarios : list of dict
+        Changes relative to the base, each scenario with the optional keys
+        - 'name': label (default: 'Szenario 1', ...)
+        - 'settings': settings that override the base settings
+        - 'Lernzeit (h)': {Tag: hours} new study hours per weekday
+        - 'Zusätzliche Lernzeit (h)': {Tag: hours} more (or, if negative, fewer) study hours
+        - 'Prüfungsdatum': {Fachname: date} moved exams
+        - 'Start': start for all subjects (e.g. '1 Monat vorher') or {Fachname: Start}
+        - 'Lernstart früher (Tage)': move all study starts this many days earlier, at most to today
+        The base itself is always included as the first scenario 'Basis'.
+    
+    settings : dict, optional
+        Base settings (default: DEFAULT_SETTINGS).
+    
+    workers : int, optional
+        Number of worker processes (default: number of CPU cores). With 1 no pool is used.
+    
+    Returns:
+    --------
+    ScenarioResult
+        summary (DataFrame, one row per scenario with total study time, fairness_* and
+        diversity_* columns and error message), subjects (DataFrame with the subject
+        statistics of all scenarios) and plans (list of study plans, None on errors).
+    """
+    basis = dict(DEFAULT_SETTINGS)
+    basis.update(settings or {})
+    scenarios = [{'name': 'Basis'}] + [dict(scenario) for scenario in scenarios]
+    namen = [scenario.get('name') or f'Szenario {i}' for i, scenario in enumerate(scenarios)]
+    if len(set(namen)) != len(namen):
+        raise ValueError("Scenario names must be unique")
+    
+    # Shared stages: SCHRITT 1 per exam variant, SCHRITT 2-4 per exam and weekly plan variant
+    pruefungen, vorbereitet, aufgaben = {}, {}, []
+    for scenario in scenarios:
+        df_exam_neu, df_plan_neu = _apply_scenario(df_exam, df_plan, scenario)
+        verschiebung = int(scenario.get('Lernstart früher (Tage)', 0))
+        exam_key = _scenario_key(df_exam_neu.to_dict('records'), verschiebung)
+        if exam_key not in pruefungen:
+            df_exam_prep = _bereite_pruefungen_vor(df_exam_neu)
+            if verschiebung:
+                today = pd.Timestamp.today().normalize()
+                lernstart = pd.to_datetime(df_exam_prep['Lernstart']) - pd.Timedelta(days=verschiebung)
+                df_exam_prep['Lernstart'] = lernstart.clip(lower=today)
+            pruefungen[exam_key] = df_exam_prep
+        
+        plan_key = _scenario_key(exam_key, df_plan_neu[_PLAN_KEY_COLUMNS].to_dict('records'))
+        if plan_key not in vorbereitet:
+            vorbereitet[plan_key] = _prepare_stages(pruefungen[exam_key].copy(), df_plan_neu)
+        
+        scenario_settings = {**basis, **scenario.get('settings', {})}
+        plan_inputs = None if verschiebung else _plan_inputs(df_exam_neu, df_plan_neu, scenario_settings)
+        aufgaben.append((plan_key, scenario_settings, plan_inputs))
+    
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(aufgaben)))
+    
+    if workers == 1:
+        ergebnisse = [_evaluate_scenario(vorbereitet[key], s) for key, s, _ in aufgaben]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_evaluate_scenario, vorbereitet[key], s) for key, s, _ in aufgaben]
+            ergebnisse = [future.result() for future in futures]
+    
+    zeilen, fach_zeilen, plans = [], [], []
+    for name, (_, _, plan_inputs), (df_lernplan, gesamt_stats, fehler) in zip(namen, aufgaben, ergebnisse):
+        zeile = {'Szenario': name}
+        if gesamt_stats is not None:
+            zeile['Gesamte verfügbare Lernzeit (h)'] = gesamt_stats['Gesamte verfügbare Lernzeit (h)']
+            zeile['Gesamtzahl der Tage im Lernplan'] = gesamt_stats['Gesamtzahl der Tage im Lernplan']
+            for metrik, wert in gesamt_stats['Fairness-Metriken'].items():
+                zeile[f'fairness_{metrik}'] = float(wert)
+            for metrik, wert in gesamt_stats['Diversitäts-Metriken'].items():
+                zeile[f'diversity_{metrik}'] = float(wert)
+            for fach, stats in gesamt_stats['Fach-Statistiken'].items():
+                fach_zeilen.append({'Szenario': name, 'Fach': fach, **stats})
+            if plan_inputs is not None:
+                df_lernplan.attrs['plan_inputs'] = plan_inputs
+        zeile['Fehler'] = fehler
+        zeilen.append(zeile)
+        plans.append(df_lernplan)
+    
+    df_subjects = pd.DataFrame(fach_zeilen, columns=['Szenario', 'Fach', 'target_hours', 'scheduled_hours',
+                                                     'percentage', 'shortfall'])
+    return ScenarioResult(pd.DataFrame(zeilen), df_subjects, plans)
+
+
 def create_example_study_plan():
     """
     Erstellt einen Beispiel-Lernplan mit Demo-Daten.
@@ -1148,4 +2997,4 @@ if __name__ == "__main__":
     print("\nStatistiken pro Fach:")
     for fach, stats in statistiken['Fach-Statistiken'].items():
         print(f"{fach}: Ziel {stats['target_hours']}h, geplant {stats['scheduled_hours']}h " +
-              f"({stats['percentage']:.1f}%)")
\ No newline at end of file
+              f"({stats['percentage']:.1f}%)")
@@ -0,0 +1,31 @@
+"""
+Color palette for the plan views
+--------------------------------
+Static copy of matplotlib's 'tab10' palette as hex strings, so the Lernplan page
+does not have to import matplotlib just to read the colors.
+"""
+
+TAB10 = [
+    "#1f77b4",  # Blau
+    "#ff7f0e",  # Orange
+    "#2ca02c",  # Grün
+    "#d62728",  # Rot
+    "#9467bd",  # Lila
+    "#8c564b",  # Braun
+    "#e377c2",  # Pink
+    "#7f7f7f",  # Grau
+    "#bcbd22",  # Oliv
+    "#17becf",  # Cyan
+]
+
+# Rot (Index 3) ist für Prüfungen reserviert
+EXAM_COLOR = TAB10[3]
+SUBJECT_COLORS = [color for i, color in enumerate(TAB10) if i != 3]
+
+
+def subject_color_mapping(subjects):
+    """Assign every subject a fixed palette color, in sorted order and without the exam red."""
+    return {
+        subject: SUBJECT_COLORS[i % len(SUBJECT_COLORS)]
+        for i, subject in enumerate(sorted(subjects))
+    }
@@ -0,0 +1,218 @@
+"""
+Persistent plan store
+---------------------
+Keeps generated study plans in a local SQLite database, so they survive server
+restarts and a returning user with unchanged inputs does not pay for a new
+generation. Every plan is stored together with its statistics as one compact
+blob (pickle, zlib-compressed), keyed by user id and plan_fingerprint of its
+inputs; the raw inputs are kept next to it as JSON.
+
+The database runs in WAL mode, so several Streamlit sessions can read while one
+writes. Every thread gets its own connection. Old plans are evicted per user
+(only the most recently used max_plans_per_user are kept) and by age.
+
+Usage:
+    store = PlanStore('lernplaene.db')
+    store.save(user_id, plan_fingerprint(df_exam, df_plan, settings), df_lernplan, gesamt_stats)
+    cached = store.load(user_id, key)    # (df_lernplan, gesamt_stats) or None
+"""
+
+import json
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+
+import pandas as pd
+
+# Version of the blob encoding; rows written with another version are treated as missing
+_FORMAT_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS plans (
+    user_id      TEXT    NOT NULL,
+    fingerprint  TEXT    NOT NULL,
+    created      REAL    NOT NULL,
+    accessed     REAL    NOT NULL,
+    start_date   TEXT,
+    end_date     TEXT,
+    format       INTEGER NOT NULL,
+    inputs       TEXT,
+    plan         BLOB    NOT NULL,
+    PRIMARY KEY (user_id, fingerprint)
+);
+CREATE INDEX IF NOT EXISTS idx_plans_user_accessed ON plans (user_id, accessed);
+CREATE INDEX IF NOT EXISTS idx_plans_dates ON plans (start_date, end_date);
+"""
+
+
+def encode_plan(df_lernplan, gesamt_stats=None):
+    """Encode a plan (including its attrs) and its statistics as one compressed blob."""
+    return zlib.compress(pickle.dumps((df_lernplan, gesamt_stats), protocol=pickle.HIGHEST_PROTOCOL), 6)
+
+
+def decode_plan(blob):
+    """Inverse of encode_plan: returns (df_lernplan, gesamt_stats)."""
+    return pickle.loads(zlib.decompress(blob))
+
+
+def _date_range(df_lernplan):
+    """First and last plan date as ISO strings, or (None, None) for an empty plan."""
+    if df_lernplan.empty:
+        return None, None
+    datum = pd.to_datetime(df_lernplan['Datum'])
+    return datum.min().date().isoformat(), datum.max().date().isoformat()
+
+
+class PlanStore:
+    """
+    SQLite store for study plans, keyed by user id and plan_fingerprint.
+
+    path : str
+        Database file (created if it is missing).
+    max_plans_per_user : int, optional
+        Only the most recently used plans are kept per user (default: 10).
+    max_age_days : float, optional
+        Plans not loaded for this many days are deleted (default: 90).
+    """
+
+    def __init__(self, path='lernplaene.db', max_plans_per_user=10, max_age_days=90):
+        self.path = path
+        self.max_plans_per_user = max_plans_per_user
+        self.max_age_days = max_age_days
+        self._local = threading.local()
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self):
+        # sqlite3 connections must not be shared between threads; one per thread
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        """Close the connection of the calling thread."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def save(self, user_id, fingerprint, df_lernplan, gesamt_stats=None):
+        """Save a study plan (replacing a stored one with the same key)."""
+        self.save_many([(user_id, fingerprint, df_lernplan, gesamt_stats)])
+
+    def save_many(self, entries):
+        """
+        Save many study plans in one transaction, e.g. the results of a batch run.
+
+        entries : iterable of (user_id, fingerprint, df_lernplan, gesamt_stats)
+        """
+        jetzt = time.time()
+        rows = []
+        for user_id, fingerprint, df_lernplan, gesamt_stats in entries:
+            start_date, end_date = _date_range(df_lernplan)
+            inputs = df_lernplan.attrs.get('plan_inputs')
+            rows.append((str(user_id), fingerprint, jetzt, jetzt, start_date, end_date, _FORMAT_VERSION,
+                         json.dumps(inputs, default=str, ensure_ascii=False) if inputs is not None else None,
+                         encode_plan(df_lernplan, gesamt_stats)))
+        if not rows:
+            return
+
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO plans (user_id, fingerprint, created, accessed, start_date, end_date, '
+                'format, inputs, plan) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+        self.evict(users={row[0] for row in rows})
+
+    def _decode_row(self, user_id, fingerprint, format_version, blob):
+        """Decode a stored plan; rows that cannot be read anymore are dropped."""
+        if format_version == _FORMAT_VERSION:
+            try:
+                return decode_plan(blob)
+            except Exception:
+                pass
+        conn = self._connection()
+        with conn:
+            conn.execute('DELETE FROM plans WHERE user_id = ? AND fingerprint = ?', (user_id, fingerprint))
+        return None
+
+    def contains(self, user_id, fingerprint):
+        """Check whether a plan is stored for the user and plan_fingerprint, without loading it."""
+        row = self._connection().execute('SELECT 1 FROM plans WHERE user_id = ? AND fingerprint = ?',
+                                         (str(user_id), fingerprint)).fetchone()
+        return row is not None
+
+    def load(self, user_id, fingerprint):
+        """Load a user's plan for a plan_fingerprint as (df_lernplan, gesamt_stats), or None."""
+        conn = self._connection()
+        row = conn.execute('SELECT format, plan FROM plans WHERE user_id = ? AND fingerprint = ?',
+                           (str(user_id), fingerprint)).fetchone()
+        if row is None:
+            return None
+        with conn:
+            conn.execute('UPDATE plans SET accessed = ? WHERE user_id = ? AND fingerprint = ?',
+                         (time.time(), str(user_id), fingerprint))
+        return self._decode_row(str(user_id), fingerprint, *row)
+
+    def latest(self, user_id):
+        """The user's most recently saved or loaded plan as (df_lernplan, gesamt_stats), or None."""
+        row = self._connection().execute(
+            'SELECT fingerprint, format, plan FROM plans WHERE user_id = ? ORDER BY accessed DESC LIMIT 1',
+            (str(user_id),)).fetchone()
+        if row is None:
+            return None
+        return self._decode_row(str(user_id), *row)
+
+    def list_plans(self, user_id=None, start=None, end=None):
+        """
+        Overview of the stored plans (without the plans themselves) as a DataFrame.
+
+        Optionally filtered by user and to plans whose period overlaps [start, end].
+        """
+        bedingungen, parameter = [], []
+        if user_id is not None:
+            bedingungen.append('user_id = ?')
+            parameter.append(str(user_id))
+        if end is not None:
+            bedingungen.append('start_date <= ?')
+            parameter.append(pd.Timestamp(end).date().isoformat())
+        if start is not None:
+            bedingungen.append('end_date >= ?')
+            parameter.append(pd.Timestamp(start).date().isoformat())
+
+        sql = ('SELECT user_id, fingerprint, created, accessed, start_date, end_date, length(plan) AS bytes '
+               'FROM plans')
+        if bedingungen:
+            sql += ' WHERE ' + ' AND '.join(bedingungen)
+        df = pd.read_sql_query(sql + ' ORDER BY accessed DESC', self._connection(), params=parameter)
+        df['created'] = pd.to_datetime(df['created'], unit='s')
+        df['accessed'] = pd.to_datetime(df['accessed'], unit='s')
+        return df
+
+    def evict(self, users=None):
+        """
+        Delete plans older than max_age_days and, per user, all but the
+        max_plans_per_user most recently used ones. users limits the latter to
+        the given users. Returns the number of deleted plans.
+        """
+        conn = self._connection()
+        geloescht = 0
+        with conn:
+            if self.max_age_days is not None:
+                grenze = time.time() - self.max_age_days * 86400
+                geloescht += conn.execute('DELETE FROM plans WHERE accessed < ?', (grenze,)).rowcount
+
+            if self.max_plans_per_user is not None:
+                if users is None:
+                    users = [row[0] for row in conn.execute('SELECT DISTINCT user_id FROM plans')]
+                for user_id in users:
+                    geloescht += conn.execute(
+                        'DELETE FROM plans WHERE user_id = ? AND fingerprint NOT IN ('
+                        'SELECT fingerprint FROM plans WHERE user_id = ? ORDER BY accessed DESC LIMIT ?)',
+                        (user_id, user_id, self.max_plans_per_user)).rowcount
+        return geloescht
@@ -0,0 +1,57 @@
+"""
+generate_complete_study_plan must produce exactly the plans of the original pipeline.
+
+data/baseline_plans.json holds plans built by the baseline version of my_func
+(before the array-backed allocation) for a few synthetic inputs, with "today"
+fixed to the date stored in the file. Values, column dtypes and the empty cells
+(None in object columns) must all match.
+"""
+
+import json
+import os
+import sys
+import warnings
+
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import my_func
+from synthetic import create_synthetic_input
+
+warnings.simplefilter('ignore', FutureWarning)
+
+with open(os.path.join(os.path.dirname(__file__), 'data', 'baseline_plans.json'), encoding='utf-8') as f:
+    BASELINE = json.load(f)
+
+
+def _baseline_frame(fall):
+    spalten = list(zip(*fall['rows']))
+    return pd.DataFrame({
+        name: pd.Series(werte, dtype=fall['dtypes'][name]) if not fall['dtypes'][name].startswith('datetime')
+        else pd.to_datetime(pd.Series(werte)).astype(fall['dtypes'][name])
+        for name, werte in zip(fall['columns'], spalten)
+    })
+
+
+@pytest.fixture
+def fixed_today(monkeypatch):
+    today = pd.Timestamp(BASELINE['today'])
+    monkeypatch.setattr(pd.Timestamp, 'today', classmethod(lambda cls, tz=None: today))
+
+
+@pytest.mark.parametrize('fall', BASELINE['plans'], ids=lambda fall: f"{fall['n_exams']}x{fall['horizon_days']}")
+def test_plan_matches_baseline(fall, fixed_today):
+    df_exam, df_plan = create_synthetic_input(fall['n_exams'], fall['horizon_days'], fall['review_share'],
+                                              seed=fall['seed'])
+    df_lernplan, _ = my_func.generate_complete_study_plan(df_exam, df_plan)
+
+    erwartet = _baseline_frame(fall)
+    pd.testing.assert_frame_equal(df_lernplan, erwartet)
+    for spalte in erwartet.columns:
+        if erwartet[spalte].dtype == object:
+            leer = df_lernplan[spalte][df_lernplan[spalte].isna()]
+            assert all(wert is None for wert in leer), spalte
@@ -0,0 +1,41 @@
+"""compare_scenarios must return the same tables with and without worker processes."""
+
+import os
+import sys
+import warnings
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import my_func
+from synthetic import create_synthetic_input
+
+warnings.simplefilter('ignore', FutureWarning)
+
+SZENARIEN = [
+    {'name': 'Samstag +1 h', 'Zusätzliche Lernzeit (h)': {'Samstag': 1.0}},
+    {'name': 'Zwei Wochen früher', 'Start': '1 Monat vorher', 'Lernstart früher (Tage)': 14},
+]
+
+
+def test_serial_and_parallel_results_are_identical():
+    df_exam, df_plan = create_synthetic_input(6, 90, 0.4, seed=1)
+
+    seriell = my_func.compare_scenarios(df_exam, df_plan, SZENARIEN, workers=1)
+    parallel = my_func.compare_scenarios(df_exam, df_plan, SZENARIEN, workers=2)
+
+    assert list(seriell.summary['Szenario']) == ['Basis', 'Samstag +1 h', 'Zwei Wochen früher']
+    assert seriell.summary['Fehler'].isna().all()
+    pd.testing.assert_frame_equal(seriell.summary, parallel.summary)
+    pd.testing.assert_frame_equal(seriell.subjects, parallel.subjects)
+    assert len(seriell.plans) == len(parallel.plans) == 3
+    for plan_seriell, plan_parallel in zip(seriell.plans, parallel.plans):
+        pd.testing.assert_frame_equal(plan_seriell, plan_parallel)
+
+    # The scenarios must actually change the plan, otherwise the comparison above proves little
+    basis, samstag, frueher = seriell.summary['Gesamte verfügbare Lernzeit (h)']
+    assert samstag > basis
+    assert not seriell.plans[0].equals(seriell.plans[2])
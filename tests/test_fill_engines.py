@@ -0,0 +1,107 @@
+"""Regression tests for the allocation engines of fill_study_plan."""
+
+import copy
+import os
+import sys
+import warnings
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import my_func
+from synthetic import create_synthetic_input
+
+warnings.simplefilter('ignore', FutureWarning)
+
+
+def _min_completion(df_exam, df_plan, settings):
+    _, stats = my_func.generate_complete_study_plan(df_exam.copy(), df_plan.copy(), settings=dict(settings))
+    return stats['Fairness-Metriken']['min_percentage']
+
+
+# Inputs where the optimize engine used to leave subjects at 0 % because reserved days were exclusive
+@pytest.mark.parametrize('seed, horizon, weekly_hours', [
+    (4, 30, 14.0), (4, 45, 21.0), (6, 21, 28.0), (9, 30, 21.0), (9, 45, 21.0), (10, 30, 14.0),
+])
+def test_optimize_not_below_greedy_with_reserved_days(seed, horizon, weekly_hours):
+    df_exam, df_plan = create_synthetic_input(12, horizon, 0.3, weekly_hours=weekly_hours, seed=seed)
+    settings = {'split_threshold': 3.0, 'dedicated_days_before_exam': 3}
+    greedy = _min_completion(df_exam, df_plan, {**settings, 'engine': 'greedy'})
+    optimize = _min_completion(df_exam, df_plan, {**settings, 'engine': 'optimize'})
+    assert optimize > 0
+    assert optimize >= greedy - 1e-9
+
+
+@pytest.mark.parametrize('seed', range(4))
+@pytest.mark.parametrize('settings', [{}, {'split_threshold': 2.0, 'dedicated_days_before_exam': 1}])
+def test_optimize_not_below_greedy(seed, settings):
+    df_exam, df_plan = create_synthetic_input(8, 120, 0.3, weekly_hours=21.0, seed=seed)
+    greedy = _min_completion(df_exam, df_plan, {**settings, 'engine': 'greedy'})
+    optimize = _min_completion(df_exam, df_plan, {**settings, 'engine': 'optimize'})
+    assert optimize >= greedy - 1e-9
+
+
+def _lp_max_min(grid, subjects_remaining):
+    """Highest lowest completion (in %) of the continuous relaxation: windows and day capacities only."""
+    linprog = pytest.importorskip('scipy.optimize').linprog
+    subjects = list(subjects_remaining)
+    n_days, n_subjects = len(grid['dates']), len(subjects)
+    capacity = []
+    for d in range(n_days):
+        if grid['hours'][d] <= 0 or grid['has_exam'][d]:
+            capacity.append(0)
+            continue
+        capacity.append(grid['hours'][d] - sum(grid['durations'][i][d] for i in range(3)
+                                               if not grid['empty'][i][d] and grid['durations'][i][d] > 0))
+
+    # Variables: hours x[s, d] and the level t; maximize t
+    n_vars = n_subjects * n_days + 1
+    c = np.zeros(n_vars)
+    c[-1] = -1
+    a_ub, b_ub, bounds = [], [], []
+    for d in range(n_days):
+        row = np.zeros(n_vars)
+        row[[k * n_days + d for k in range(n_subjects)]] = 1
+        a_ub.append(row)
+        b_ub.append(capacity[d])
+    for k, subject in enumerate(subjects):
+        info = subjects_remaining[subject]
+        row = np.zeros(n_vars)
+        row[k * n_days:(k + 1) * n_days] = -1 / info['target_hours']
+        row[-1] = 1
+        a_ub.append(row)
+        b_ub.append(info['already_planned'] / info['target_hours'])
+        row = np.zeros(n_vars)
+        row[k * n_days:(k + 1) * n_days] = 1
+        a_ub.append(row)
+        b_ub.append(info['remaining_hours'])
+        for datum in grid['dates']:
+            bounds.append((0, None if info['start_date'] <= datum <= info['exam_date'] else 0))
+    bounds.append((0, 1))
+    result = linprog(c, A_ub=np.array(a_ub), b_ub=b_ub, bounds=bounds, method='highs')
+    return -result.fun * 100
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_optimize_reaches_lp_max_min_without_reserved_days(seed, monkeypatch):
+    captured = {}
+    original = my_func._optimize_allocation
+
+    def capture(grid, subjects_remaining, dedicated_study_days, split_threshold):
+        captured['input'] = (copy.deepcopy(grid), copy.deepcopy(subjects_remaining))
+        return original(grid, subjects_remaining, dedicated_study_days, split_threshold)
+
+    monkeypatch.setattr(my_func, '_optimize_allocation', capture)
+    df_exam, df_plan = create_synthetic_input(8, 120, 0.3, weekly_hours=14.0, seed=seed)
+    optimize = _min_completion(df_exam, df_plan, {'engine': 'optimize', 'split_threshold': 0,
+                                                  'dedicated_days_before_exam': 0})
+
+    grid, subjects_remaining = captured['input']
+    optimum = _lp_max_min(grid, subjects_remaining)
+    # Up to one quarter hour per subject below the continuous optimum
+    toleranz = max(25 / info['target_hours'] for info in subjects_remaining.values())
+    assert optimize >= optimum - toleranz - 1e-6
@@ -0,0 +1,118 @@
+"""
+write_ics_file must produce the events of the former page export (create_ics_file).
+
+The reference below is the old export path of the Lernplan page, without its
+Streamlit error reporting: it formatted the plan as 'Fach (x h)' labels and parsed
+them back. Two differences are intended: Lernfach 3, which the old table dropped,
+is exported now, and slots with zero hours are skipped.
+"""
+
+import io
+import os
+import re
+import sys
+import warnings
+from datetime import timedelta
+
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import my_func
+from synthetic import create_synthetic_input
+
+warnings.simplefilter('ignore', FutureWarning)
+
+
+def _alte_tabelle(df_studyplan):
+    df_clean = df_studyplan.copy()
+    for i, row in df_studyplan.iterrows():
+        if pd.notnull(row['Lernfach 1']):
+            df_clean.at[i, 'Lernfach 1'] = f"{row['Lernfach 1']} ({row['Dauer 1']} h)"
+        if pd.notnull(row['Lernfach 2']):
+            df_clean.at[i, 'Lernfach 2'] = f"{row['Lernfach 2']} ({row['Dauer 2']} h)"
+        if row['Daily Review'] != "":
+            df_clean.at[i, 'Daily Review'] = f"{row['Daily Review']} ({row['Dauer 4']} h)"
+    return df_clean.drop(['Wochentag', 'Lernzeit (h)', 'Lernfach 3', 'Dauer 3', 'freie_zeit', 'Dauer 1',
+                          'Dauer 2', 'Dauer 4'], axis=1)
+
+
+def _alter_eintrag(summary, datum, stunden, description):
+    start = datum.replace(hour=8, minute=0, second=0, microsecond=0)
+    ende = start + timedelta(hours=float(stunden))
+    return [f"SUMMARY:{summary}", f"DTSTART:{start.strftime('%Y%m%dT%H%M%S')}",
+            f"DTEND:{ende.strftime('%Y%m%dT%H%M%S')}", f"DESCRIPTION:{description}"]
+
+
+def _alte_stunden(info):
+    treffer = re.search(r'\((\d+\.?\d*)\s*h\)', info)
+    if treffer:
+        return info.split('(')[0].strip(), float(treffer.group(1))
+    return info, 2.0
+
+
+def _alte_events(df):
+    """Events of the former create_ics_file, without UID lines."""
+    events = []
+    for _, row in df.iterrows():
+        datum = row['Datum']
+        if pd.notna(row['Prüfung']) and row['Prüfung'] != 'None':
+            fach, stunden = _alte_stunden(row['Prüfung'])
+            events.append(_alter_eintrag(f"PRÜFUNG: {fach}", datum, stunden, "Prüfungstermin"))
+        for spalte in row.index:
+            wert = row[spalte]
+            if spalte not in ['Datum', 'Prüfung', 'Daily Review'] and pd.notna(wert) and wert not in ('None', ''):
+                fach, stunden = _alte_stunden(wert)
+                events.append(_alter_eintrag(f"Lernen: {fach}", datum, stunden, f"{stunden} Stunden"))
+        review = row['Daily Review']
+        if pd.notna(review) and review not in ('None', ''):
+            treffer = re.search(r'\((\d+\.?\d*)\s*h\)', review)
+            gesamt = float(treffer.group(1))
+            faecher = [f.strip() for f in review.split('(')[0].strip().split(',') if f.strip()]
+            for fach in faecher:
+                stunden = gesamt / len(faecher)
+                events.append(_alter_eintrag(f"Daily Review: {fach}", datum, stunden,
+                                             f"Wiederholung: {stunden} Stunden"))
+    return events
+
+
+def _neue_events(df_lernplan):
+    puffer = io.StringIO()
+    anzahl = my_func.write_ics_file(df_lernplan, puffer)
+    zeilen = puffer.getvalue().splitlines()
+    events, aktuell = [], None
+    for zeile in zeilen:
+        if zeile == 'BEGIN:VEVENT':
+            aktuell = []
+        elif zeile == 'END:VEVENT':
+            events.append(aktuell)
+            aktuell = None
+        elif aktuell is not None and not zeile.startswith('UID:'):
+            aktuell.append(zeile)
+    assert anzahl == len(events)
+    assert zeilen[:5] == my_func._ICS_HEADER and zeilen[-1] == 'END:VCALENDAR'
+    return events
+
+
+@pytest.mark.parametrize('seed, n_exams, horizon', [(0, 4, 60), (1, 8, 120), (2, 12, 90)])
+def test_events_match_former_export(seed, n_exams, horizon):
+    df_exam, df_plan = create_synthetic_input(n_exams, horizon, 0.6, seed=seed)
+    df_lernplan, _ = my_func.generate_complete_study_plan(df_exam, df_plan, settings={'split_threshold': 2.0})
+
+    # Without slot 3 the only intended difference left are the zero-hour slots
+    ohne_slot3 = df_lernplan.assign(**{'Lernfach 3': None, 'Dauer 3': 0.0})
+    erwartet = [event for event in _alte_events(_alte_tabelle(ohne_slot3))
+                if event[-1] != 'DESCRIPTION:0.0 Stunden']
+    assert _neue_events(ohne_slot3) == erwartet
+    assert any(event[0].startswith('SUMMARY:Daily Review') for event in erwartet)
+
+    # A slot 3 entry adds its own event (the pipeline rarely fills slot 3, so set one here)
+    mit_slot3 = ohne_slot3.copy()
+    tag = mit_slot3.index[mit_slot3['Prüfung'].isna()][0]
+    mit_slot3.loc[tag, ['Lernfach 3', 'Dauer 3']] = ['Fach 1', 0.75]
+    neu = _neue_events(mit_slot3)
+    zusaetzlich = _alter_eintrag('Lernen: Fach 1', mit_slot3.loc[tag, 'Datum'], 0.75, '0.75 Stunden')
+    assert len(neu) == len(erwartet) + 1 and zusaetzlich in neu
@@ -0,0 +1,35 @@
+"""plan_fingerprint must not depend on how the inputs were passed or used."""
+
+import os
+import sys
+import warnings
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import my_func
+from synthetic import create_synthetic_input
+
+warnings.simplefilter('ignore', FutureWarning)
+
+
+def test_exam_dates_as_text_or_timestamp():
+    df_exam, df_plan = create_synthetic_input(4, 60, 0.3, seed=1)
+    als_text = df_exam.assign(Prüfungsdatum=pd.to_datetime(df_exam['Prüfungsdatum']).dt.strftime('%Y-%m-%d'))
+    als_datum = df_exam.assign(Prüfungsdatum=pd.to_datetime(df_exam['Prüfungsdatum']))
+    assert my_func.plan_fingerprint(als_text, df_plan) == my_func.plan_fingerprint(als_datum, df_plan)
+
+
+def test_inline_batch_leaves_inputs_unchanged():
+    df_exam, df_plan = create_synthetic_input(4, 60, 0.3, seed=1)
+    df_exam = df_exam.assign(Prüfungsdatum=pd.to_datetime(df_exam['Prüfungsdatum']).dt.strftime('%Y-%m-%d'))
+    vorher_exam, vorher_plan = df_exam.copy(), df_plan.copy()
+
+    [(df_lernplan, _, fehler)] = my_func.generate_study_plans_batch([(df_exam, df_plan)], workers=1)
+
+    assert fehler is None and df_lernplan is not None
+    pd.testing.assert_frame_equal(df_exam, vorher_exam)
+    pd.testing.assert_frame_equal(df_plan, vorher_plan)
@@ -0,0 +1,82 @@
+"""PlanStore: unreadable rows are dropped, list_plans filters by period, stored plans reach the cache."""
+
+import os
+import sys
+import warnings
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import my_func
+import plan_store
+from plan_store import PlanStore
+from synthetic import create_synthetic_input
+
+warnings.simplefilter('ignore', FutureWarning)
+
+
+def test_stored_plan_is_put_into_the_cache(tmp_path):
+    df_exam, df_plan = create_synthetic_input(4, 60, 0.3, seed=3)
+    key = my_func.plan_fingerprint(df_exam, df_plan)
+    df_lernplan, stats = my_func.generate_complete_study_plan(df_exam.copy(), df_plan.copy())
+
+    store = PlanStore(str(tmp_path / 'plaene.db'))
+    assert not store.contains('nutzer', key)
+    store.save('nutzer', key, df_lernplan, stats)
+    assert store.contains('nutzer', key)
+
+    my_func.clear_plan_cache()
+    assert my_func.peek_cached_plan(df_exam, df_plan) is None
+    my_func.put_cached_plan(df_exam, df_plan, None, *store.load('nutzer', key))
+    cached_plan, cached_stats = my_func.peek_cached_plan(df_exam, df_plan)
+    pd.testing.assert_frame_equal(cached_plan, df_lernplan)
+    assert cached_stats == stats
+    my_func.clear_plan_cache()
+
+
+def _kleiner_plan(start, tage):
+    return pd.DataFrame({'Datum': pd.date_range(start, periods=tage), 'Lernzeit (h)': 2.0})
+
+
+def _setze_spalte(store, spalte, wert):
+    conn = store._connection()
+    with conn:
+        conn.execute(f'UPDATE plans SET {spalte} = ?', (wert,))
+
+
+def test_unreadable_row_is_dropped(tmp_path):
+    store = PlanStore(str(tmp_path / 'plaene.db'))
+    store.save('nutzer', 'a', _kleiner_plan('2025-03-01', 5), {'x': 1})
+    _setze_spalte(store, 'plan', b'kein zlib')
+
+    assert store.load('nutzer', 'a') is None
+    assert not store.contains('nutzer', 'a')
+
+
+def test_row_with_other_format_version_is_dropped(tmp_path):
+    store = PlanStore(str(tmp_path / 'plaene.db'))
+    store.save('nutzer', 'a', _kleiner_plan('2025-03-01', 5), {'x': 1})
+    _setze_spalte(store, 'format', plan_store._FORMAT_VERSION + 1)
+
+    assert store.latest('nutzer') is None
+    assert not store.contains('nutzer', 'a')
+
+
+def test_list_plans_filters_by_overlapping_period(tmp_path):
+    store = PlanStore(str(tmp_path / 'plaene.db'))
+    store.save('anna', 'maerz', _kleiner_plan('2025-03-01', 31))
+    store.save('anna', 'april', _kleiner_plan('2025-04-01', 30))
+    store.save('ben', 'mai', _kleiner_plan('2025-05-01', 31))
+
+    def plaene(**kriterien):
+        return sorted(store.list_plans(**kriterien)['fingerprint'])
+
+    assert plaene() == ['april', 'maerz', 'mai']
+    assert plaene(start='2025-03-31', end='2025-04-01') == ['april', 'maerz']
+    assert plaene(start='2025-04-15') == ['april', 'mai']
+    assert plaene(end='2025-03-31') == ['maerz']
+    assert plaene(user_id='anna', start='2025-04-15') == ['april']
+    assert plaene(start='2025-06-01') == []
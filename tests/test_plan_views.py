@@ -0,0 +1,36 @@
+"""Cached plan views: with a plan_key a rerun does not hash the plan again."""
+
+import os
+import sys
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import my_func
+from synthetic import create_synthetic_input
+
+warnings.simplefilter('ignore', FutureWarning)
+
+
+def test_views_keyed_by_plan_key_skip_the_content_hash(monkeypatch):
+    df_exam, df_plan = create_synthetic_input(4, 60, 0.3, seed=5)
+    df_lernplan, _ = my_func.generate_complete_study_plan(df_exam.copy(), df_plan.copy())
+    plan_key = my_func.plan_fingerprint(df_exam, df_plan)
+    farben = {fach: '#123456' for fach in df_exam['Fachname']}
+    my_func.clear_view_cache()
+    erwartet_events = my_func.build_calendar_events(df_lernplan, farben)
+    erwartet_stats = my_func.dashboard_statistics(df_lernplan, today=df_lernplan['Datum'].min().date())
+
+    def kein_hash(df):
+        raise AssertionError('plan_content_fingerprint called despite plan_key')
+
+    monkeypatch.setattr(my_func, 'plan_content_fingerprint', kein_hash)
+    for _ in range(2):
+        events = my_func.calendar_events_window(df_lernplan, farben, '2000-01-01', '2100-01-01', plan_key=plan_key)
+        stats = my_func.dashboard_statistics(df_lernplan, today=df_lernplan['Datum'].min().date(),
+                                             plan_key=plan_key)
+    assert events == erwartet_events
+    assert stats == erwartet_stats
+    my_func.clear_view_cache()
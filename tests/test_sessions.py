@@ -0,0 +1,41 @@
+"""The long sessions table must represent a plan without loss."""
+
+import os
+import sys
+import warnings
+
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import my_func
+from synthetic import create_synthetic_input
+
+warnings.simplefilter('ignore', FutureWarning)
+
+
+@pytest.mark.parametrize('seed, n_exams, horizon', [(0, 4, 60), (1, 8, 120), (2, 12, 200)])
+def test_round_trip_wide_sessions_wide(seed, n_exams, horizon):
+    df_exam, df_plan = create_synthetic_input(n_exams, horizon, 0.5, seed=seed)
+    df_lernplan, _ = my_func.generate_complete_study_plan(df_exam, df_plan)
+
+    sitzungen = my_func.plan_sessions(df_lernplan, subjects=df_exam['Fachname'])
+    pd.testing.assert_frame_equal(my_func.sessions_to_plan(sitzungen, df_lernplan), df_lernplan)
+
+
+def test_session_on_unknown_date_is_rejected():
+    df_exam, df_plan = create_synthetic_input(4, 60, 0.5, seed=0)
+    df_lernplan, _ = my_func.generate_complete_study_plan(df_exam, df_plan)
+    sitzungen = my_func.plan_sessions(df_lernplan)
+
+    # A day inside the plan that the calendar lacks, and a day after its end
+    ohne_tag = df_lernplan[df_lernplan['Datum'] != sitzungen['Datum'].iloc[0]]
+    with pytest.raises(ValueError, match='not in the calendar'):
+        my_func.sessions_to_plan(sitzungen, ohne_tag)
+    spaeter = sitzungen.copy()
+    spaeter.loc[0, 'Datum'] = df_lernplan['Datum'].max() + pd.Timedelta(days=30)
+    with pytest.raises(ValueError, match='not in the calendar'):
+        my_func.sessions_to_plan(spaeter, df_lernplan)
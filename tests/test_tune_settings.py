@@ -0,0 +1,46 @@
+"""tune_settings must stop at its time budget instead of waiting for running candidates."""
+
+import os
+import sys
+import time
+import warnings
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import my_func
+from synthetic import create_synthetic_input
+
+warnings.simplefilter('ignore', FutureWarning)
+
+LANGSAM = 3.0
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason='the patched planner reaches the workers only by fork')
+def test_time_budget_does_not_wait_for_running_candidates(monkeypatch):
+    import multiprocessing
+    if multiprocessing.get_start_method(allow_none=True) not in (None, 'fork'):
+        pytest.skip('the patched planner reaches the workers only by fork')
+
+    original = my_func._plan_from_prepared
+
+    # Only the first candidate is quick; every other one runs far past the budget
+    def planen(shared, settings):
+        if settings['fairness_weight'] != 1.0:
+            time.sleep(LANGSAM)
+        return original(shared, settings)
+
+    monkeypatch.setattr(my_func, '_plan_from_prepared', planen)
+    df_exam, df_plan = create_synthetic_input(4, 30, 0.3, seed=0)
+
+    start = time.perf_counter()
+    result = my_func.tune_settings(df_exam, df_plan, search_space={'fairness_weight': [1.0, 2.0, 3.0, 4.0]},
+                                   time_budget=0.5, workers=2)
+    dauer = time.perf_counter() - start
+
+    assert result.settings['fairness_weight'] == 1.0
+    assert len(result.trials) == 1
+    assert dauer < LANGSAM
@@ -0,0 +1,69 @@
+"""update_plan must replan as well as a full regeneration with the changed inputs."""
+
+import os
+import sys
+import warnings
+
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import my_func
+from synthetic import create_synthetic_input
+
+warnings.simplefilter('ignore', FutureWarning)
+
+
+@pytest.fixture(scope='module')
+def plan_input():
+    df_exam, df_plan = create_synthetic_input(10, 730, 0.3, weekly_hours=56.0, seed=2)
+    df_exam['Start'] = '3 Monate'
+    df_lernplan, _ = my_func.generate_complete_study_plan(df_exam.copy(), df_plan.copy())
+    return df_exam, df_plan, df_lernplan
+
+
+@pytest.mark.parametrize('index', [3, 7])
+def test_moved_exam_matches_full_regeneration(plan_input, index):
+    df_exam, df_plan, df_lernplan = plan_input
+    fach = df_exam['Fachname'][index]
+    neues_datum = pd.Timestamp(df_exam['Prüfungsdatum'][index]) + pd.Timedelta(days=10)
+
+    _, stats_update = my_func.update_plan(df_lernplan, {'Fachname': fach, 'Prüfungsdatum': neues_datum})
+
+    df_exam_neu = df_exam.copy()
+    df_exam_neu['Prüfungsdatum'] = pd.to_datetime(df_exam_neu['Prüfungsdatum'])
+    df_exam_neu.loc[index, 'Prüfungsdatum'] = neues_datum
+    _, stats_voll = my_func.generate_complete_study_plan(df_exam_neu, df_plan.copy())
+
+    update = stats_update['Fach-Statistiken'][fach]['percentage']
+    voll = stats_voll['Fach-Statistiken'][fach]['percentage']
+    assert update == pytest.approx(voll, abs=1.0)
+
+
+def test_moved_exam_starting_now_is_replanned_from_its_exam(plan_input, monkeypatch):
+    df_exam, df_plan, _ = plan_input
+    df_exam = df_exam.copy()
+    df_exam.loc[7, 'Start'] = 'Jetzt'
+    df_lernplan, _ = my_func.generate_complete_study_plan(df_exam.copy(), df_plan.copy())
+    fach = df_exam['Fachname'][7]
+    neues_datum = pd.Timestamp(df_exam['Prüfungsdatum'][7]) + pd.Timedelta(days=10)
+
+    # Lernstart 'Jetzt' does not move with the exam, so no full regeneration is needed
+    def voll(*args, **kwargs):
+        raise AssertionError('update_plan fell back to a full regeneration')
+
+    monkeypatch.setattr(my_func, 'generate_complete_study_plan', voll)
+    df_update, _ = my_func.update_plan(df_lernplan, {'Fachname': fach, 'Prüfungsdatum': neues_datum})
+    assert df_update['Prüfung'].eq(fach).any()
+
+
+def test_unchanged_weekday_hours_keep_the_plan(plan_input, monkeypatch):
+    df_exam, df_plan, df_lernplan = plan_input
+    tag = df_plan['Tag'][0]
+    monkeypatch.setattr(my_func, 'fill_study_plan', None)
+    df_update, stats = my_func.update_plan(df_lernplan, {'Tag': tag, 'Lernzeit (h)': df_plan['Lernzeit (h)'][0]})
+    pd.testing.assert_frame_equal(df_update, df_lernplan)
+    assert stats['Fach-Statistiken'] == df_lernplan.attrs['completion_stats']